@@ -1,13 +1,26 @@
+import sys
+from pathlib import Path
 import polars as pl
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
 
+# Racine du projet (le benchmark est lancé depuis src/benchmark_solvers)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-def load_osrm_matrix(path: str) -> np.ndarray:
-    """Charge une matrice OSRM Parquet et retire la colonne d’index éventuelle."""
+from src.features.osrm_matrix import OSRMMatrix
+
+
+def load_osrm_matrix(path: str, metric: str = "distance") -> np.ndarray:
+    """
+    Charge une matrice OSRM Parquet et retire la colonne d’index éventuelle.
+    Accepte aussi le format long (src_index, dst_index, duration, distance).
+    """
     df = pl.read_parquet(path)
 
+    if {"src_index", "dst_index"}.issubset(df.columns):
+        return np.asarray(OSRMMatrix.from_long(df).get(metric), dtype=float)
+
     # Supprimer colonne index si présente
     for col in ["osrm_index", "index", "Unnamed: 0"]:
         if col in df.columns:
@@ -1,30 +1,62 @@
 import polars as pl
-import h3
+from typing import Literal
+
+from etl.utils.h3_utils import H3_NULL, cell_to_parent_expr, cells_to_str, latlng_to_cells_np
 
 
 def add_h3_columns(
     lf: pl.LazyFrame,
     latitude_col: str = "latitude",
     longitude_col: str = "longitude",
-    resolutions = (6, 7, 8, 9)
+    resolutions = (6, 7, 8, 9),
+    cell_format: Literal["str", "uint64"] = "uint64",
+    n_jobs: int = 1,
 ) -> pl.LazyFrame:
     """
-    Ajoute plusieurs colonnes H3 (string) à un LazyFrame Polars.
+    Ajoute plusieurs colonnes H3 (uint64 par défaut) à un LazyFrame Polars.
     Exemple : h3_r6, h3_r7, h3_r8, h3_r9
 
+    La résolution la plus fine est calculée une seule fois par batch (NumPy),
+    les résolutions plus grossières en sont dérivées (cell_to_parent par opérations
+    binaires, expressions natives) : h3_r6 est le parent de h3_r9, ce qui garantit
+    l'emboîtement des colonnes (peut différer de latlng_to_cell(…, 6) en bord de cellule).
+    cell_format : "uint64" (entiers compacts) ou "str" (index hexadécimal).
+    n_jobs > 1 : la colonne entière est indexée par un pool de processus
+    (plus de découpage en batches streaming).
+    Coordonnées manquantes -> null.
+
     Compatible avec H3 v4 (latlng_to_cell).
     """
 
-    for res in resolutions:
-        lf = lf.with_columns(
-            pl.struct([latitude_col, longitude_col]).map_elements(
-                lambda row, r=res: (
-                    h3.latlng_to_cell(row[latitude_col], row[longitude_col], r)
-                    if row[latitude_col] is not None and row[longitude_col] is not None
-                    else None
-                ),
-                return_dtype=pl.String
-            ).alias(f"h3_r{res}")
+    finest = max(resolutions)
+    finest_col = f"_h3_r{finest}_uint64"
+
+    def _index_batch(coords: pl.Series) -> pl.Series:
+        cells = latlng_to_cells_np(
+            coords.struct.field(latitude_col).cast(pl.Float64).fill_null(float("nan")).to_numpy(),
+            coords.struct.field(longitude_col).cast(pl.Float64).fill_null(float("nan")).to_numpy(),
+            finest,
+            n_jobs=n_jobs,
         )
+        return pl.Series(cells, dtype=pl.UInt64)
+
+    lf = lf.with_columns(
+        pl.struct([latitude_col, longitude_col])
+        .map_batches(_index_batch, return_dtype=pl.UInt64, is_elementwise=n_jobs <= 1)
+        .replace(H3_NULL, None)
+        .alias(finest_col)
+    )
+
+    lf = lf.with_columns([
+        (pl.col(finest_col) if res == finest else cell_to_parent_expr(pl.col(finest_col), res))
+        .alias(f"h3_r{res}")
+        for res in resolutions
+    ]).drop(finest_col)
+
+    if cell_format == "str":
+        lf = lf.with_columns([
+            pl.col(f"h3_r{res}").map_batches(cells_to_str, return_dtype=pl.String, is_elementwise=True)
+            for res in resolutions
+        ])
 
-    return lf
\ No newline at end of file
+    return lf
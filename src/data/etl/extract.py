@@ -1,16 +1,19 @@
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import json
 import polars as pl
 import requests
 
-from etl.utils.utils import download_with_retry
+from etl.utils.utils import download_with_retry, download_to_cache
 
 
 ROOT = Path(__file__).parent # parent directory of the script
 INPUT_DIR = ROOT / "config"
 input_path = INPUT_DIR / "index.json"
 BASE_URL = "https://object.files.data.gouv.fr/hydra-parquet/hydra-parquet"
+CACHE_DIR = Path("data") / "raw" / "cache"
+MAX_WORKERS = 6
 
 def load_index(path: str = input_path) -> dict:
     """Charge le fichier index contenant {uuid: region}."""
@@ -26,21 +29,46 @@ def extract_parquet_from_url(url: str, retries: int = 3, timeout: int = 30) -> p
     raw_bytes = download_with_retry(url, retries=retries, timeout=timeout)
     return pl.read_parquet(raw_bytes)
 
-def extract_all() -> list[pl.DataFrame]:
-    """Extrait tous les Parquet listés dans l'index et ajoute la Colonne région."""
+def download_all(cache_dir=CACHE_DIR, max_workers: int = MAX_WORKERS,
+                 retries: int = 3, timeout: int = 30) -> dict:
+    """
+    Télécharge en parallèle (pool de threads borné) les Parquet de l'index
+    vers le cache local. Retourne {uuid: {"region", "path", "changed"}} ;
+    changed=False : fichier déjà en cache et inchangé côté serveur (rien téléchargé).
+    Les régions en échec sont signalées et absentes du résultat.
+    """
     index = load_index()
+    downloads = {}
 
-    df_list = []
-    for uuid, region in index.items():
-        try:
-            url = build_url(uuid)
-            df = extract_parquet_from_url(url)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(download_to_cache, build_url(uuid), cache_dir, retries=retries, timeout=timeout): uuid
+            for uuid in index
+        }
+        for future in as_completed(futures):
+            uuid = futures[future]
+            try:
+                path, changed = future.result()
+                downloads[uuid] = {"region": index[uuid], "path": path, "changed": changed}
+            except requests.exceptions.RequestException as e:
+                print(f"[ERROR] Impossible de télécharger {uuid}: {e}")
 
-            # Ajout de la région (important pour la suite du pipeline)
-            df = df.with_columns(pl.lit(region).alias("region"))
+    n_changed = sum(d["changed"] for d in downloads.values())
+    print(f"[extract] {len(downloads)}/{len(index)} fichiers, {n_changed} nouveaux ou modifiés")
 
-            df_list.append(df)
-        except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Impossible de télécharger {uuid}: {e}")
+    # ordre de l'index (stable d'un run à l'autre)
+    return {uuid: downloads[uuid] for uuid in index if uuid in downloads}
 
-    return df_list
\ No newline at end of file
+def extract_all(cache_dir=CACHE_DIR, max_workers: int = MAX_WORKERS) -> list[pl.LazyFrame]:
+    """
+    Extrait tous les Parquet listés dans l'index (via le cache local) et ajoute
+    la Colonne région. Les fichiers sont lus en lazy (scan_parquet) : rien n'est
+    chargé en mémoire avant la collecte.
+    """
+    downloads = download_all(cache_dir=cache_dir, max_workers=max_workers)
+
+    return [
+        # Ajout de la région (important pour la suite du pipeline)
+        pl.scan_parquet(d["path"]).with_columns(pl.lit(d["region"]).alias("region"))
+        for d in downloads.values()
+    ]
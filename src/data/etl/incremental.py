@@ -0,0 +1,201 @@
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+
+import polars as pl
+
+from etl.transform import rename_columns, strip_all_string_columns, transform
+from etl.embedding.h3_indexer import add_h3_columns
+from etl.spatial_join import add_admin_codes
+from etl.scoring.density import RESOLUTION_MAP
+from etl.scoring.cell_aggregates import CellAggregates
+from etl.scoring.popularity import add_popularity
+from etl.scoring.proximity import add_proximity
+from etl.scoring.category_weight import add_category_weight
+from etl.scoring.opening_hours import add_opening_hours_score
+from etl.scoring.final_score import add_final_score
+
+# ETL incrémental :
+# - chaque ligne source normalisée reçoit une empreinte (SOURCE_HASH_COL),
+#   conservée jusque dans le snapshot merged_*.parquet
+# - les empreintes de toutes les lignes sources vues sont écrites à côté du
+#   snapshot (<snapshot>_sources.parquet), y compris celles écartées par transform
+# - au run suivant, seules les lignes d'empreinte inconnue passent par
+#   transform + H3 + jointure spatiale + scores par ligne ; les densité / diversité
+#   ne sont recalculées que pour les hexagones touchés (agrégats par hexagone
+#   persistés, cf. scoring.cell_aggregates), puis les normalisations globales
+#   (expressions simples) sont refaites sur l'ensemble
+#
+# Une ligne modifiée = une ligne supprimée + une ligne nouvelle (empreinte différente).
+# L'empreinte Polars (hash) n'est pas garantie stable entre versions de Polars :
+# après une mise à jour, toutes les lignes apparaissent nouvelles (run complet).
+# Idem si le code de transform / du scoring change : forcer un run complet.
+
+SOURCE_HASH_COL = "source_hash"
+SOURCES_SUFFIX = "_sources.parquet"
+SNAPSHOT_PATTERN = re.compile(r"^merged_\d{8}_\d{6}\.parquet$")
+
+# Colonnes recalculées pour tout le snapshot à chaque run
+CELL_SCORE_COLS = ("density_{level}", "density_{level}_norm", "diversity_{level}", "diversity_{level}_norm")
+
+
+# ---------------------------------------------------------
+# 1) Empreintes des lignes sources
+# ---------------------------------------------------------
+def add_source_hash(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Normalise les lignes sources (noms de colonnes, strip des chaînes, comme
+    le début de transform) et ajoute leur empreinte UInt64.
+    """
+    lf = strip_all_string_columns(rename_columns(lf))
+    columns = sorted(lf.collect_schema().names())
+    return lf.with_columns(pl.struct(columns).hash(seed=0).alias(SOURCE_HASH_COL))
+
+
+def sources_path(snapshot_path) -> Path:
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(snapshot_path.stem + SOURCES_SUFFIX)
+
+
+def write_source_hashes(source: pl.LazyFrame, snapshot_path) -> str:
+    """Empreintes (uniques) de toutes les lignes sources traitées pour ce snapshot."""
+    path = sources_path(snapshot_path)
+    source.select(SOURCE_HASH_COL).unique().sink_parquet(path)
+    return str(path)
+
+
+def latest_snapshot(output_dir) -> Optional[Path]:
+    """
+    Dernier snapshot merged_<horodatage>.parquet utilisable en incrémental
+    (colonne d'empreinte + fichier des empreintes sources présents), None sinon.
+    """
+    snapshots = sorted(
+        path for path in Path(output_dir).glob("merged_*.parquet")
+        if SNAPSHOT_PATTERN.match(path.name)
+    )
+    if not snapshots:
+        return None
+
+    snapshot = snapshots[-1]
+    if not sources_path(snapshot).exists():
+        return None
+    if SOURCE_HASH_COL not in pl.read_parquet_schema(snapshot):
+        return None
+    return snapshot
+
+
+# ---------------------------------------------------------
+# 2) Étapes du scoring
+# ---------------------------------------------------------
+def enrich_rows(lf: pl.LazyFrame, resolver, level: str = "commune", n_jobs: int = 1) -> pl.LazyFrame:
+    """
+    Étapes ligne à ligne (coûteuses) : H3, codes INSEE, popularité, proximité.
+    n_jobs > 1 : cellules H3 les plus fines calculées par un pool de processus
+    (cf. add_h3_columns ; la colonne de coordonnées est alors matérialisée).
+    """
+    lf = add_h3_columns(lf, latitude_col="latitude", longitude_col="longitude", n_jobs=n_jobs)
+    lf = add_admin_codes(lf, resolver, latitude_col="latitude", longitude_col="longitude")
+    return (
+        lf
+        .pipe(add_popularity)
+        .pipe(add_proximity, resolver, level=level)
+    )
+
+
+def add_global_scores(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """Scores normalisés sur tout le dataset (min–max), expressions simples sans jointure."""
+    return (
+        lf
+        .pipe(add_category_weight)
+        .pipe(add_opening_hours_score)
+        .pipe(add_final_score)
+    )
+
+
+# ---------------------------------------------------------
+# 3) Mise à jour incrémentale
+# ---------------------------------------------------------
+# même clé que transform.clean_duplicated
+DEDUP_KEY = ["nom_du_poi", "lat_r", "lon_r"]
+
+
+def _with_dedup_key(lf: pl.LazyFrame) -> pl.LazyFrame:
+    return lf.with_columns(
+        pl.col("latitude").round(5).alias("lat_r"),
+        pl.col("longitude").round(5).alias("lon_r"),
+    )
+
+
+def incremental_update(
+    source: pl.LazyFrame,
+    snapshot_path,
+    resolver,
+    level: str = "commune",
+    n_jobs: int = 1,
+) -> Tuple[pl.LazyFrame, CellAggregates]:
+    """
+    Plan lazy du nouveau snapshot à partir du précédent :
+    - lignes inchangées : reprises telles quelles du snapshot
+    - lignes nouvelles / modifiées : transform + enrich_rows
+    - lignes disparues : retirées
+    - density / diversity : agrégats par hexagone du snapshot mis à jour par
+      deltas, seuls les hexagones touchés sont recalculés ; normalisation par
+      expression à partir des min / max suivis.
+    source : sortie de add_source_hash.
+    n_jobs : transmis à enrich_rows (les lignes nouvelles sont matérialisées de toute façon).
+    Retourne (plan du snapshot, agrégats à enregistrer à côté du snapshot).
+    Un POI nouveau en doublon (nom + position) d'un POI conservé est écarté ;
+    un doublon écarté lors d'un run précédent n'est pas repêché.
+    """
+    h3_col = RESOLUTION_MAP[level]
+    cell_cols = [col.format(level=level) for col in CELL_SCORE_COLS]
+    raw_cols = [f"density_{level}", f"diversity_{level}"]
+
+    previous = pl.scan_parquet(snapshot_path)
+    seen = pl.scan_parquet(sources_path(snapshot_path))
+    source_hashes = source.select(SOURCE_HASH_COL).unique()
+
+    kept = previous.join(source_hashes, on=SOURCE_HASH_COL, how="semi")
+    removed = previous.join(source_hashes, on=SOURCE_HASH_COL, how="anti")
+
+    # Lignes nouvelles : seules à passer par transform et les étapes ligne à ligne
+    # (matérialisées une fois : réutilisées pour les agrégats par hexagone).
+    # Sans hexagone, elles seraient écartées par add_density : idem ici.
+    new_rows = (
+        enrich_rows(transform(source.join(seen, on=SOURCE_HASH_COL, how="anti")), resolver, level, n_jobs)
+        .filter(pl.col(h3_col).is_not_null())
+        .pipe(_with_dedup_key)
+        .join(_with_dedup_key(kept).select(DEDUP_KEY), on=DEDUP_KEY, how="anti")
+        .drop("lat_r", "lon_r")
+        .collect()
+    )
+
+    # Agrégats par hexagone : seuls les hexagones touchés sont recalculés
+    aggregates, updated_cells = CellAggregates.load(snapshot_path, level).apply_delta(
+        new_rows.lazy(), removed
+    )
+    print(f"[incremental] {new_rows.height} POIs nouveaux ou modifiés, {updated_cells.height} hexagones recalculés")
+
+    previous_columns = previous.collect_schema().names()
+    lf = pl.concat(
+        [kept, new_rows.lazy().drop(cell_cols, strict=False)],
+        how="diagonal_relaxed",
+    )
+
+    # Valeurs brutes : celles du snapshot, remplacées pour les hexagones touchés
+    # (petite table) ; normalisations refaites par expression
+    lf = (
+        lf.join(updated_cells.lazy(), on=h3_col, how="left", suffix="_new")
+        .with_columns([pl.coalesce(f"{col}_new", col).alias(col) for col in raw_cols])
+        .drop([f"{col}_new" for col in raw_cols])
+        .with_columns(aggregates.norm_exprs())
+    )
+    lf = add_global_scores(lf)
+
+    # ordre des colonnes du snapshot précédent (+ éventuelles nouvelles colonnes)
+    columns = lf.collect_schema().names()
+    lf = lf.select(
+        [c for c in previous_columns if c in columns]
+        + [c for c in columns if c not in previous_columns]
+    )
+    return lf, aggregates
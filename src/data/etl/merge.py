@@ -1,22 +1,30 @@
 import polars as pl
 
-def align_schemas(df_list: list[pl.DataFrame]) -> list[pl.DataFrame]:
-    # Récupère toutes les colonnes existantes
-    all_cols = set().union(*(df.columns for df in df_list))
+def union_schema(lf_list: list[pl.LazyFrame]) -> pl.Schema:
+    """
+    Schéma union des sources, calculé une seule fois.
+    Sur des scan_parquet, collect_schema ne lit que les métadonnées (footer),
+    aucune donnée n'est chargée. Pour une colonne présente avec des types
+    différents, le premier type rencontré est gardé ici ; la conversion vers
+    le supertype est faite par la concaténation (diagonal_relaxed).
+    """
+    schema = {}
+    for lf in lf_list:
+        for name, dtype in lf.collect_schema().items():
+            schema.setdefault(name, dtype)
+    return pl.Schema(schema)
 
-    aligned = []
-    for df in df_list:
-        missing = all_cols - set(df.columns)
-        # Ajoute les colonnes manquantes en Null
-        for col in missing:
-            df = df.with_columns(pl.lit(None).alias(col))
-        aligned.append(df.select(sorted(all_cols)))  # ordre stable
-    return aligned
-
-def merge_dataframes(df_list: list[pl.DataFrame]) -> pl.DataFrame:
+def merge_dataframes(df_list: list[pl.LazyFrame | pl.DataFrame]) -> pl.LazyFrame:
+    """
+    Fusion lazy des sources régionales : les colonnes manquantes d'une source
+    sont complétées en Null par la concaténation diagonale, rien n'est lu
+    avant la collecte (ou le sink) du plan final.
+    """
     if not df_list:
         raise ValueError("No dataframes to merge")
 
-    aligned = align_schemas(df_list)
-    merged = pl.concat(aligned, how="vertical_relaxed")
-    return merged
\ No newline at end of file
+    lf_list = [df.lazy() for df in df_list]
+    schema = union_schema(lf_list)
+
+    merged = pl.concat(lf_list, how="diagonal_relaxed")
+    return merged.select(sorted(schema.names()))  # ordre stable
@@ -1,7 +1,16 @@
 import polars as pl
 from pathlib import Path
 from datetime import datetime
+from typing import Optional, Sequence
+from urllib.parse import quote
 from .sql.split_tables import split_into_tables
+from .utils.dataset import (
+    HIVE_NULL,
+    PARTITION_COLS,
+    ROW_GROUP_SIZE,
+    SORT_COL,
+    commune_index_path,
+)
 
 DATA_DIR = Path("data")
 OUTPUT_DIR = DATA_DIR / "processed" 
@@ -10,7 +19,7 @@ OUTPUT_DIR = DATA_DIR / "processed"
 # 1) Sauvegarde Parquet
 # ---------------------------------------------------------
 
-def save_parquet(df: pl.DataFrame, output_dir: str = OUTPUT_DIR, versioned: bool = True) -> str:
+def _parquet_output_path(output_dir: str, versioned: bool) -> Path:
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
     if versioned:
@@ -19,30 +28,117 @@ def save_parquet(df: pl.DataFrame, output_dir: str = OUTPUT_DIR, versioned: bool
     else:
         filename = f"merged.parquet"
 
-    output_path = Path(output_dir) / filename
+    return Path(output_dir) / filename
+
+
+def save_parquet(
+    df: pl.DataFrame,
+    output_dir: str = OUTPUT_DIR,
+    versioned: bool = True,
+    partition_by: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    Écrit merged_*.parquet, ou, si partition_by est fourni (ex. PARTITION_COLS),
+    un dataset partitionné merged_*/ (cf. write_parquet_dataset).
+    """
+    output_path = _parquet_output_path(output_dir, versioned)
+
+    if partition_by:
+        return write_parquet_dataset(df.lazy(), output_path.with_suffix(""), partition_by)
+
     df.write_parquet(output_path)
 
     return str(output_path)
 
+
+def sink_parquet(lf: pl.LazyFrame, output_dir: str = OUTPUT_DIR, versioned: bool = True) -> str:
+    """
+    Exécute le plan lazy une seule fois avec le moteur streaming
+    et écrit le résultat directement en Parquet (sans DataFrame intermédiaire).
+    """
+    output_path = _parquet_output_path(output_dir, versioned)
+    lf.sink_parquet(output_path)
+
+    return str(output_path)
+
+def _hive_dir(key: dict) -> str:
+    return "/".join(
+        f"{col}={HIVE_NULL if value is None else quote(str(value), safe='')}"
+        for col, value in key.items()
+    )
+
+
+def write_parquet_dataset(
+    lf: pl.LazyFrame,
+    dataset_dir: str,
+    partition_by: Sequence[str] = PARTITION_COLS,
+    sort_by: str = SORT_COL,
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> str:
+    """
+    Dataset Parquet partitionné façon hive (une partition = un répertoire col=valeur) :
+    - fichiers triés par sort_by (cellule H3) avec des row groups de row_group_size
+      lignes et leurs statistiques min/max -> pruning des row groups ;
+    - index des communes (partition, h3_min, h3_max, n_pois) écrit à côté,
+      utilisé par POIFilter pour traduire une commune en partitions + plage H3.
+    Chaque partition est écrite en streaming, indépendamment des autres.
+    """
+    lf = lf.lazy()
+    partition_by = list(partition_by)
+    dataset_dir = Path(dataset_dir)
+
+    keys = lf.select(partition_by).unique().collect()
+    for key in keys.iter_rows(named=True):
+        predicate = pl.all_horizontal([
+            pl.col(col).is_null() if value is None else pl.col(col) == value
+            for col, value in key.items()
+        ])
+
+        part_dir = dataset_dir / _hive_dir(key)
+        part_dir.mkdir(parents=True, exist_ok=True)
+
+        (
+            lf.filter(predicate)
+            .drop(partition_by)
+            .sort(sort_by, nulls_last=True)
+            .sink_parquet(part_dir / "part-0.parquet", row_group_size=row_group_size, statistics=True)
+        )
+
+    (
+        lf.group_by([*partition_by, "commune"])
+        .agg([
+            pl.col(sort_by).min().alias("h3_min"),
+            pl.col(sort_by).max().alias("h3_max"),
+            pl.len().alias("n_pois"),
+        ])
+        .sort([*partition_by, "commune"])
+        .collect()
+        .write_parquet(commune_index_path(dataset_dir))
+    )
+
+    return str(dataset_dir)
+
 # ---------------------------------------------------------
 # 2) Split + Export CSV
 # ---------------------------------------------------------
-def save_tables_csv(df: pl.DataFrame, output_dir: str = OUTPUT_DIR) -> dict:
+def save_tables_csv(df: pl.DataFrame | pl.LazyFrame, output_dir: str = OUTPUT_DIR) -> dict:
     """
-    Split le DataFrame enrichi en tables relationnelles
+    Split le jeu enrichi en tables relationnelles
     puis exporte chaque table en CSV dans output_dir.
+    Avec un LazyFrame (ex. pl.scan_parquet du snapshot), poi et adresse
+    sont écrites en streaming : le jeu complet n'est jamais chargé en mémoire.
 
-    Retourne un dict contenant les DataFrames des tables.
+    Retourne un dict contenant les tables (LazyFrame pour poi / adresse).
     """
 
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
     # Split en tables relationnelles
-    tables = split_into_tables(df)
+    tables = split_into_tables(df.lazy())
 
     # Export CSV
-    tables["poi"].write_csv(Path(output_dir) / "poi.csv")
-    tables["adresse"].write_csv(Path(output_dir) / "adresse.csv")
+    tables["poi"].sink_csv(Path(output_dir) / "poi.csv")
+    tables["adresse"].sink_csv(Path(output_dir) / "adresse.csv")
     tables["main_category"].write_csv(Path(output_dir) / "main_category.csv")
     tables["sub_category"].write_csv(Path(output_dir) / "sub_category.csv")
 
@@ -27,7 +27,7 @@ def add_category_weight(lf: pl.LazyFrame) -> pl.LazyFrame:
     # 1) Poids brut
     lf = lf.with_columns(
         pl.col("main_category")
-        .replace(CATEGORY_WEIGHTS, default=DEFAULT_WEIGHT)
+        .replace_strict(CATEGORY_WEIGHTS, default=DEFAULT_WEIGHT, return_dtype=pl.Float64)
         .alias("category_weight")
     )
 
@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import polars as pl
+
+from etl.scoring.density import RESOLUTION_MAP
+
+# Agrégats par hexagone persistés à côté du snapshot, mis à jour par deltas :
+# - <snapshot>_cells.parquet      : histogramme h3, main_category, n
+#   density  = nombre de POIs de catégorie non nulle de l'hexagone
+#   diversity = nombre de catégories distinctes (comme n_unique)
+# - <snapshot>_cell_stats.parquet : statistiques de normalisation, sous forme
+#   metric ("density" | "diversity"), value, n_cells (nombre d'hexagones ayant
+#   cette valeur) -> min / max exacts, même quand l'hexagone extrême change
+CELLS_SUFFIX = "_cells.parquet"
+CELL_STATS_SUFFIX = "_cell_stats.parquet"
+METRICS = ("density", "diversity")
+
+
+def _sidecar(snapshot_path, suffix: str) -> Path:
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(snapshot_path.stem + suffix)
+
+
+def category_histogram(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
+    """Histogramme h3, main_category, n (UInt32) ; lignes sans hexagone ignorées."""
+    h3_col = RESOLUTION_MAP[level]
+    return (
+        lf.filter(pl.col(h3_col).is_not_null())
+        .group_by([h3_col, "main_category"])
+        .agg(pl.len().alias("n"))
+    )
+
+
+@dataclass
+class CellAggregates:
+    """
+    Histogramme des catégories par hexagone + comptage des valeurs de
+    density / diversity, pour un niveau (colonne h3 de RESOLUTION_MAP).
+    """
+    histogram: pl.DataFrame
+    value_counts: pl.DataFrame
+    level: str = "commune"
+
+    @property
+    def h3_col(self) -> str:
+        return RESOLUTION_MAP[self.level]
+
+    # -----------------------------
+    # CONSTRUCTION / PERSISTANCE
+    # -----------------------------
+
+    @staticmethod
+    def cell_values(histogram, level: str = "commune") -> pl.LazyFrame:
+        """h3, density_{level}, diversity_{level} à partir de l'histogramme."""
+        return (
+            histogram.lazy()
+            .group_by(RESOLUTION_MAP[level])
+            .agg([
+                pl.col("n").filter(pl.col("main_category").is_not_null()).sum()
+                .cast(pl.UInt32).alias(f"density_{level}"),
+                pl.len().alias(f"diversity_{level}"),
+            ])
+        )
+
+    @staticmethod
+    def count_values(cells: pl.DataFrame, level: str = "commune") -> pl.DataFrame:
+        """metric, value, n_cells pour un ensemble d'hexagones."""
+        return pl.concat([
+            cells.group_by(pl.col(f"{metric}_{level}").cast(pl.Int64).alias("value"))
+            .agg(pl.len().cast(pl.Int64).alias("n_cells"))
+            .select(pl.lit(metric).alias("metric"), "value", "n_cells")
+            for metric in METRICS
+        ])
+
+    @classmethod
+    def from_frame(cls, lf: pl.LazyFrame, level: str = "commune") -> "CellAggregates":
+        """Calcul complet à partir d'un snapshot (un seul group_by)."""
+        histogram = category_histogram(lf.lazy(), level).collect()
+        cells = cls.cell_values(histogram, level).collect()
+        return cls(histogram, cls.count_values(cells, level), level)
+
+    @classmethod
+    def load(cls, snapshot_path, level: str = "commune") -> "CellAggregates":
+        """Agrégats persistés du snapshot ; recalculés depuis le snapshot s'ils manquent."""
+        cells_path = _sidecar(snapshot_path, CELLS_SUFFIX)
+        stats_path = _sidecar(snapshot_path, CELL_STATS_SUFFIX)
+        if not (cells_path.exists() and stats_path.exists()):
+            return cls.from_frame(pl.scan_parquet(snapshot_path), level)
+        return cls(pl.read_parquet(cells_path), pl.read_parquet(stats_path), level)
+
+    def save(self, snapshot_path):
+        self.histogram.write_parquet(_sidecar(snapshot_path, CELLS_SUFFIX))
+        self.value_counts.write_parquet(_sidecar(snapshot_path, CELL_STATS_SUFFIX))
+
+    # -----------------------------
+    # MISE À JOUR PAR DELTAS
+    # -----------------------------
+
+    def apply_delta(self, added: pl.LazyFrame, removed: pl.LazyFrame):
+        """
+        added / removed : POIs ajoutés / retirés (h3, main_category).
+        Seuls les hexagones touchés sont relus et recalculés.
+        Retourne (nouveaux agrégats, DataFrame h3, density, diversity des
+        hexagones touchés encore non vides).
+        """
+        h3_col, level = self.h3_col, self.level
+
+        delta = pl.concat([
+            category_histogram(added, level).with_columns(pl.col("n").cast(pl.Int64)),
+            category_histogram(removed, level).with_columns(-pl.col("n").cast(pl.Int64)),
+        ]).collect()
+        affected = delta.select(h3_col).unique()
+
+        before = self.histogram.join(affected, on=h3_col, how="semi")
+        after = (
+            pl.concat([before.with_columns(pl.col("n").cast(pl.Int64)), delta])
+            .group_by([h3_col, "main_category"])
+            .agg(pl.col("n").sum())
+            .filter(pl.col("n") > 0)
+            .with_columns(pl.col("n").cast(pl.UInt32))
+        )
+
+        cells_before = self.cell_values(before, level).collect()
+        cells_after = self.cell_values(after, level).collect()
+
+        # n_cells : - anciennes valeurs des hexagones touchés, + nouvelles
+        value_counts = (
+            pl.concat([
+                self.value_counts,
+                self.count_values(cells_before, level).with_columns(-pl.col("n_cells")),
+                self.count_values(cells_after, level),
+            ])
+            .group_by(["metric", "value"])
+            .agg(pl.col("n_cells").sum())
+            .filter(pl.col("n_cells") > 0)
+            .sort(["metric", "value"])
+        )
+
+        histogram = pl.concat([
+            self.histogram.join(affected, on=h3_col, how="anti"),
+            after.select(self.histogram.columns),
+        ])
+
+        return CellAggregates(histogram, value_counts, level), cells_after
+
+    # -----------------------------
+    # NORMALISATION
+    # -----------------------------
+
+    def bounds(self, metric: str):
+        values = self.value_counts.filter(pl.col("metric") == metric)["value"]
+        return values.min(), values.max()
+
+    def norm_exprs(self) -> list:
+        """
+        density_{level}_norm / diversity_{level}_norm à partir des colonnes brutes
+        et des min / max suivis : simple expression par ligne, sans group_by ni jointure.
+        Mêmes formules que add_density (log1p puis min–max) et add_diversity (min–max).
+        """
+        density_col, diversity_col = f"density_{self.level}", f"diversity_{self.level}"
+        d_min, d_max = self.bounds("density")
+        v_min, v_max = self.bounds("diversity")
+
+        log_min, log_max = pl.lit(d_min).log1p(), pl.lit(d_max).log1p()
+        return [
+            (
+                (pl.col(density_col).log1p() - log_min) / (log_max - log_min)
+            ).alias(f"{density_col}_norm"),
+            (
+                (pl.col(diversity_col) - v_min) / (pl.lit(v_max) - v_min)
+            ).alias(f"{diversity_col}_norm"),
+        ]
+
+
+if __name__ == "__main__":
+    import time
+    import numpy as np
+
+    # python -m etl.scoring.cell_aggregates : recalcul complet vs mise à jour par deltas
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    categories = ["Patrimoine & Monuments", "Nature & Paysages", "Culture & Musées", "Sports & Loisirs"]
+    pois = pl.DataFrame({
+        "h3_r8": rng.integers(0, 200_000, n).astype(np.uint64),
+        "main_category": rng.choice(categories, n),
+    })
+
+    start = time.perf_counter()
+    aggregates = CellAggregates.from_frame(pois.lazy())
+    aggregates.cell_values(aggregates.histogram).collect()
+    print(f"recalcul complet ({n} POIs) : {time.perf_counter() - start:.3f} s")
+
+    added, removed = pois.sample(1_000, seed=1), pois.sample(1_000, seed=2)
+    start = time.perf_counter()
+    aggregates, cells = aggregates.apply_delta(added.lazy(), removed.lazy())
+    aggregates.norm_exprs()
+    print(f"delta 1000 + / 1000 - ({cells.height} hexagones) : {time.perf_counter() - start:.3f} s")
@@ -9,28 +9,33 @@ RESOLUTION_MAP = {
 }
 
 
-def add_density(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
-    """
-    Ajoute une Colonne de densité locale basée sur la résolution H3 choisie.
-
-    level : "region" | "commune" | "quartier"
-    """
-
+def _check_level(level: str):
     if level not in RESOLUTION_MAP:
         raise ValueError(f"level doit être {list(RESOLUTION_MAP.keys())}")
 
+
+def density_by_cell(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
+    """
+    Densité brute par hexagone : h3_col, density_{level}.
+    Lignes sans hexagone ignorées : elles ne seraient pas jointes et ne doivent
+    pas peser dans le min–max (comme CellAggregates).
+    """
+    _check_level(level)
     h3_col = RESOLUTION_MAP[level]
-    density_col = f"density_{level}"
-    density_norm_col = f"{density_col}_norm"
 
-    # 1) Densité brute par hexagone
-    density = (
-        lf.group_by(h3_col)
-        .agg(pl.col("main_category").count().alias(density_col))
+    return (
+        lf.filter(pl.col(h3_col).is_not_null())
+        .group_by(h3_col)
+        .agg(pl.col("main_category").count().alias(f"density_{level}"))
     )
 
-    # 2) Normalisation Log
-    density = density.with_columns([
+
+def normalize_density(cells: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
+    """Ajoute density_{level}_norm (log puis min–max sur l'ensemble des hexagones)."""
+    _check_level(level)
+    density_col = f"density_{level}"
+
+    return cells.with_columns([
         (pl.col(density_col).log1p()).alias("density_log")
     ]).with_columns([
         (
@@ -39,5 +44,21 @@ def add_density(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
         ).alias(f"{density_col}_norm")
     ]).drop("density_log")
 
+
+def add_density(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
+    """
+    Ajoute une Colonne de densité locale basée sur la résolution H3 choisie.
+
+    level : "region" | "commune" | "quartier"
+    """
+    _check_level(level)
+    h3_col = RESOLUTION_MAP[level]
+
+    # 1) Densité brute par hexagone
+    density = density_by_cell(lf, level)
+
+    # 2) Normalisation Log
+    density = normalize_density(density, level)
+
     # 3) Join sur le LazyFrame original
     return lf.join(density, on=h3_col)
@@ -6,33 +6,55 @@ RESOLUTION_MAP = {
     "commune": "h3_r8",
 }
 
-def add_diversity(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
-    """
-    Ajoute :
-    - diversity_{level} : diversité brute (n_unique)
-    - diversity_{level}_norm : diversité normalisée (0–1)
-    """
 
+def _check_level(level: str):
     if level not in RESOLUTION_MAP:
         raise ValueError(f"level doit être {list(RESOLUTION_MAP.keys())}")
 
+
+def diversity_by_cell(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
+    """
+    Diversité brute par hexagone : h3_col, diversity_{level}.
+    Lignes sans hexagone ignorées : elles ne seraient pas jointes et ne doivent
+    pas peser dans le min–max (comme CellAggregates).
+    """
+    _check_level(level)
     h3_col = RESOLUTION_MAP[level]
-    diversity_col = f"diversity_{level}"
-    diversity_norm_col = f"{diversity_col}_norm"
 
-    # 1) Diversité brute par hexagone
-    diversity = (
-        lf.group_by(h3_col)
-          .agg(pl.col("main_category").n_unique().alias(diversity_col))
+    return (
+        lf.filter(pl.col(h3_col).is_not_null())
+          .group_by(h3_col)
+          .agg(pl.col("main_category").n_unique().alias(f"diversity_{level}"))
     )
 
-    # 2) Normalisation min–max
-    diversity = diversity.with_columns([
+
+def normalize_diversity(cells: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
+    """Ajoute diversity_{level}_norm (min–max sur l'ensemble des hexagones)."""
+    _check_level(level)
+    diversity_col = f"diversity_{level}"
+
+    return cells.with_columns([
         (
             (pl.col(diversity_col) - pl.col(diversity_col).min()) /
             (pl.col(diversity_col).max() - pl.col(diversity_col).min())
-        ).alias(diversity_norm_col)
+        ).alias(f"{diversity_col}_norm")
     ])
 
+
+def add_diversity(lf: pl.LazyFrame, level: str = "commune") -> pl.LazyFrame:
+    """
+    Ajoute :
+    - diversity_{level} : diversité brute (n_unique)
+    - diversity_{level}_norm : diversité normalisée (0–1)
+    """
+    _check_level(level)
+    h3_col = RESOLUTION_MAP[level]
+
+    # 1) Diversité brute par hexagone
+    diversity = diversity_by_cell(lf, level)
+
+    # 2) Normalisation min–max
+    diversity = normalize_diversity(diversity, level)
+
     # 3) Join sur le LazyFrame original
-    return lf.join(diversity, on=h3_col)
\ No newline at end of file
+    return lf.join(diversity, on=h3_col)
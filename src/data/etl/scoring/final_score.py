@@ -18,10 +18,11 @@ def add_final_score(lf: pl.LazyFrame) -> pl.LazyFrame:
     """
 
     score_expr = None
+    columns = lf.collect_schema().names()
 
     # Construction du score brut
     for col, weight in WEIGHTS.items():
-        if col in lf.columns:
+        if col in columns:
             expr = weight * pl.col(col)
             score_expr = expr if score_expr is None else score_expr + expr
 
@@ -17,31 +17,32 @@ def add_opening_hours_score(lf: pl.LazyFrame) -> pl.LazyFrame:
     # 1. Normalisation des colonnes existantes ou valeurs par défaut
     # ---------------------------------------------------------
 
+    columns = lf.collect_schema().names()
     lf = lf.with_columns([
 
         # Ouvert maintenant (bool → 0/1)
         (
             pl.col("is_open_now").cast(pl.Float64).fill_null(0)
-            if "is_open_now" in lf.columns else pl.lit(0.0)
+            if "is_open_now" in columns else pl.lit(0.0)
         ).alias("is_open_now"),
 
         # Nombre d'heures d'ouverture par jour (normalisé sur 12h)
         (
             (pl.col("open_hours_count").cast(pl.Float64).fill_null(0) / 12)
             .clip(0, 1)
-            if "open_hours_count" in lf.columns else pl.lit(0.0)
+            if "open_hours_count" in columns else pl.lit(0.0)
         ).alias("open_hours_norm"),
 
         # Ouvert tard (bool → 0/1)
         (
             pl.col("open_late").cast(pl.Float64).fill_null(0)
-            if "open_late" in lf.columns else pl.lit(0.0)
+            if "open_late" in columns else pl.lit(0.0)
         ).alias("open_late"),
 
         # Ouvert le weekend (bool → 0/1)
         (
             pl.col("open_weekend").cast(pl.Float64).fill_null(0)
-            if "open_weekend" in lf.columns else pl.lit(0.0)
+            if "open_weekend" in columns else pl.lit(0.0)
         ).alias("open_weekend"),
     ])
 
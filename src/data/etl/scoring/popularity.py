@@ -1,5 +1,4 @@
 import polars as pl
-import math
 
 def add_popularity(lf: pl.LazyFrame, k: int = 50) -> pl.LazyFrame:
     """
@@ -15,15 +14,16 @@ def add_popularity(lf: pl.LazyFrame, k: int = 50) -> pl.LazyFrame:
     # ---------------------------------------------------------
     # 1. colonnes par défaut si absentes
     # ---------------------------------------------------------
+    columns = lf.collect_schema().names()
     lf = lf.with_columns([
         (
             pl.col("rating").cast(pl.Float64).fill_null(0)
-            if "rating" in lf.columns else pl.lit(0.0)
+            if "rating" in columns else pl.lit(0.0)
         ).alias("rating"),
 
         (
             pl.col("review_count").cast(pl.Float64).fill_null(0)
-            if "review_count" in lf.columns else pl.lit(0.0)
+            if "review_count" in columns else pl.lit(0.0)
         ).alias("review_count"),
     ])
 
@@ -40,11 +40,7 @@ def add_popularity(lf: pl.LazyFrame, k: int = 50) -> pl.LazyFrame:
     # ---------------------------------------------------------
     lf = lf.with_columns([
         pl.when(pl.col("review_count") > 0)
-        .then(
-            pl.col("review_count").map_elements(
-                lambda r: 1 - math.exp(-r / k)
-            )
-        )
+        .then(1 - (-pl.col("review_count") / k).exp())
         .otherwise(0.0)
         .alias("reviews_norm")
     ])
@@ -1,39 +1,5 @@
 import polars as pl
-import math
-from etl.utils.bounding_box import BoundingBoxResolver
-
-resolver = BoundingBoxResolver()
-
-# ---------------------------------------------------------
-# Distance Haversine (km)
-# ---------------------------------------------------------
-def haversine(latitude1, longitude1, latitude2, longitude2):
-    if (
-        latitude1 is None or longitude1 is None or
-        latitude2 is None or longitude2 is None
-    ):
-        return None
-
-    try:
-        latitude1 = float(latitude1)
-        longitude1 = float(longitude1)
-        latitude2 = float(latitude2)
-        longitude2 = float(longitude2)
-    except (TypeError, ValueError):
-        return None
-
-    R = 6371
-    dlat = math.radians(latitude2 - latitude1)
-    dlongitude = math.radians(longitude2 - longitude1)
-
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(math.radians(latitude1))
-        * math.cos(math.radians(latitude2))
-        * math.sin(dlongitude / 2) ** 2
-    )
-
-    return 2 * R * math.asin(math.sqrt(a))
+from etl.utils.geo import haversine_expr
 
 
 # ---------------------------------------------------------
@@ -47,87 +13,41 @@ def add_proximity(lf: pl.LazyFrame, resolver, level: str = "commune", tau: float
 
     Normalisation : exp(-distance / tau)
     tau = distance caractéristique (5 km par défaut)
+
+    Entièrement en expressions Polars (pas de collect ni d'UDF) : le plan reste lazy.
+    Distance et score sont null si une coordonnée ou le centroïde manque.
     """
 
     if level not in ("commune", "region"):
         raise ValueError("level doit être 'commune' ou 'region'")
 
     key = level
-    centroid_func = (
-        resolver.get_city_centroid if level == "commune"
-        else resolver.get_region_centroid
-    )
-
-    # 1) Extraire les valeurs uniques
-    values = (
-        lf.lazy().select(key)
-        .unique()
-        .collect()[key]
-        .to_list()
-    )
 
-    # 2) Calculer les centroids valides
-    centroids = {}
-    for v in values:
-        c = centroid_func(v)
-        if c is not None:
-            centroids[v] = c
+    # 1) Join avec les centroïdes du référentiel (même type de frame que l'entrée)
+    centroids = resolver.centroids_frame(level)
+    if isinstance(lf, pl.LazyFrame):
+        centroids = centroids.lazy()
+    lf = lf.join(centroids, on=key, how="left")
 
-    # 3) Aucun centroid → colonnes vides
-    if len(centroids) == 0:
-        return lf.with_columns([
-            pl.lit(None).alias(f"proximity_{level}"),
-            pl.lit(None).alias(f"proximity_{level}_norm"),
-        ])
-
-    # 4) DataFrame des centroids
-    df_centroids = (
-        pl.DataFrame({
-            key: list(centroids.keys()),
-            "centroid_lat": [c[0] for c in centroids.values()],
-            "centroid_lon": [c[1] for c in centroids.values()],
-        })
-        .with_columns(pl.col(key).cast(pl.Utf8))
-    )
-
-    # 5) Join
-    lf = lf.join(df_centroids, on=key, how="left")
-
-    # 6) Distance Haversine brute
+    # 2) Distance Haversine brute (coordonnées non numériques -> null)
     dist_col = f"proximity_{level}"
     lf = lf.with_columns(
-        pl.when(
-            pl.col("latitude").is_not_null()
-            & pl.col("longitude").is_not_null()
-            & pl.col("centroid_lat").is_not_null()
-            & pl.col("centroid_lon").is_not_null()
-        )
-        .then(
-            pl.struct(["latitude", "longitude", "centroid_lat", "centroid_lon"])
-            .map_elements(lambda r: haversine(
-                r["latitude"],
-                r["longitude"],
-                r["centroid_lat"],
-                r["centroid_lon"]
-            ))
-        )
-        .otherwise(None)
-        .alias(dist_col)
+        haversine_expr(
+            pl.col("latitude").cast(pl.Float64, strict=False),
+            pl.col("longitude").cast(pl.Float64, strict=False),
+            pl.col("centroid_lat"),
+            pl.col("centroid_lon"),
+        ).alias(dist_col)
     )
 
-
-    # 7) Log-scaling pour lisser les outliers
+    # 3) Log-scaling pour lisser les outliers
     lf = lf.with_columns([
         pl.col(dist_col).log1p().alias(f"{dist_col}_log")
     ])
 
-    # 8) Normalisation exponentielle sur la distance lissée
+    # 4) Normalisation exponentielle sur la distance lissée
     lf = lf.with_columns([
-        pl.when(pl.col(f"{dist_col}_log").is_not_null())
-        .then(pl.col(f"{dist_col}_log").map_elements(lambda d: math.exp(-d / tau)))
-        .otherwise(None)
-        .alias(f"{dist_col}_norm")
+        (-pl.col(f"{dist_col}_log") / tau).exp().alias(f"{dist_col}_norm")
     ])
 
-
-    return lf
\ No newline at end of file
+    return lf
@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import polars as pl
+
+# Niveaux administratifs -> Colonne ajoutée (code INSEE du polygone contenant le POI)
+ADMIN_CODE_COLUMNS = {
+    "commune": "commune_code",
+    "departement": "departement_code",
+    "region": "region_code",
+}
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def locate_codes(
+    resolver,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    level: str = "commune",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    n_jobs: int = None,
+) -> np.ndarray:
+    """
+    Code du polygone (commune / département / région) contenant chaque point.
+    Jointure spatiale par chunks sur le STRtree de la couche, répartis sur un
+    pool de threads (les prédicats shapely libèrent le GIL).
+    """
+    resolver.layers[level].tree  # construit une seule fois, avant le pool
+
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    bounds = range(0, len(latitudes), chunk_size)
+
+    def _locate(start):
+        return resolver.locate_points(
+            latitudes[start:start + chunk_size],
+            longitudes[start:start + chunk_size],
+            level=level,
+            column="code",
+        )
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs <= 1 or len(bounds) <= 1:
+        chunks = [_locate(start) for start in bounds]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            chunks = list(pool.map(_locate, bounds))
+
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=object)
+
+
+def add_admin_codes(
+    lf: pl.LazyFrame,
+    resolver,
+    levels=("commune", "departement", "region"),
+    latitude_col: str = "latitude",
+    longitude_col: str = "longitude",
+    n_jobs: int = None,
+) -> pl.LazyFrame:
+    """
+    Ajoute commune_code / departement_code / region_code (codes INSEE) d'après
+    la position géographique du POI, et non le champ texte code_postal_et_commune.
+    Point hors de tout polygone ou coordonnées manquantes -> null.
+    Calcul par batch (map_batches) : compatible avec le plan lazy / streaming.
+    """
+
+    # couches + STRtree chargés ici, dans le thread principal : les batches sont
+    # exécutés dans les threads de Polars (lecture GeoParquet/pyproj non sûre)
+    for level in levels:
+        resolver.layers[level].tree
+
+    def _codes_batch(coords: pl.Series, level: str) -> pl.Series:
+        codes = locate_codes(
+            resolver,
+            coords.struct.field(latitude_col).cast(pl.Float64).fill_null(float("nan")).to_numpy(),
+            coords.struct.field(longitude_col).cast(pl.Float64).fill_null(float("nan")).to_numpy(),
+            level=level,
+            n_jobs=n_jobs,
+        )
+        return pl.Series(codes.tolist(), dtype=pl.String)
+
+    return lf.with_columns([
+        pl.struct([latitude_col, longitude_col])
+        .map_batches(lambda s, level=level: _codes_batch(s, level), return_dtype=pl.String, is_elementwise=True)
+        .alias(ADMIN_CODE_COLUMNS[level])
+        for level in levels
+    ])
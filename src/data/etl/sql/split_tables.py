@@ -1,64 +1,73 @@
 import polars as pl
 
 
-def build_category_tables(df: pl.DataFrame):
+def build_category_tables(lf: pl.LazyFrame):
+    """
+    Tables des catégories (petites : matérialisées) et injection de
+    main_category_id / sub_category_id dans le LazyFrame principal.
+    Les identifiants suivent l'ordre trié des catégories : ils sont donc
+    identiques d'une exécution du plan à l'autre.
+    """
     df_main_category = (
-        df.select("main_category")
+        lf.select("main_category")
           .unique()
+          .sort("main_category", nulls_last=True)
+          .collect()
           .with_row_index("main_category_id")
     )
 
-    df = df.join(df_main_category, on="main_category", how="left")
+    lf = lf.join(df_main_category.lazy(), on="main_category", how="left")
 
     df_sub_category = (
-        df.select(["sub_category", "main_category_id"])
+        lf.select(["sub_category", "main_category_id"])
           .unique()
+          .sort(["main_category_id", "sub_category"], nulls_last=True)
+          .collect()
           .with_row_index("sub_category_id")
     )
 
-    df = df.join(
-        df_sub_category,
+    lf = lf.join(
+        df_sub_category.lazy(),
         on=["sub_category", "main_category_id"],
         how="left"
     )
 
-    return df_main_category, df_sub_category, df
+    return df_main_category, df_sub_category, lf
 
 
-def build_poi_id(df: pl.DataFrame) -> pl.DataFrame:
+def build_poi_id(lf: pl.LazyFrame) -> pl.LazyFrame:
     """
     Ajoute un identifiant unique pour chaque POI.
+    À appliquer directement sur le scan : l'ordre du fichier rend
+    poi_id stable entre les différentes tables exportées.
     """
-    return df.with_row_index("poi_id")
+    return lf.with_row_index("poi_id")
 
 
-def build_adresse_table(df: pl.DataFrame):
+def build_adresse_table(lf: pl.LazyFrame):
     """
     Construit la table adresse avec un adresse_id
-    et ajoute adresse_id dans le DataFrame principal.
+    et ajoute adresse_id dans le LazyFrame principal.
+    Une adresse par POI : adresse_id reprend poi_id, ce qui évite
+    un unique() + join sur tout le jeu de données.
     """
 
-    # On part du df qui contient déjà poi_id
-    df_adresse = (
-        df.select([
-            "poi_id",
-            "adresse",
-            "code_postal",
-            "commune",
-            "departement",
-            "region",
-        ])
-        .unique()                      # au cas où
-        .with_row_index("adresse_id")  # PK adresse
-    )
+    lf = lf.with_columns(pl.col("poi_id").alias("adresse_id"))
 
-    # On réinjecte adresse_id dans le df principal
-    df = df.join(df_adresse.select(["adresse_id", "poi_id"]), on="poi_id", how="left")
+    lf_adresse = lf.select([
+        "adresse_id",
+        "poi_id",
+        "adresse",
+        "code_postal",
+        "commune",
+        "departement",
+        "region",
+    ])
 
-    return df_adresse, df
+    return lf_adresse, lf
 
 
-def build_poi_table(df: pl.DataFrame):
+def build_poi_table(lf: pl.LazyFrame):
     """
     Construit la table POI avec poi_id + adresse_id.
     """
@@ -85,32 +94,40 @@ def build_poi_table(df: pl.DataFrame):
         # "embedding",
         'final_score']
 
-    existing_cols = [c for c in desired_cols if c in df.columns]
+    schema = lf.collect_schema()
+    existing_cols = [c for c in desired_cols if c in schema]
 
-    df_poi = df.select(existing_cols)
+    # Cellules H3 uint64 -> Int64 (BIGINT SQL) : un index H3 tient sur 63 bits
+    lf_poi = lf.select(existing_cols).with_columns([
+        pl.col(c).cast(pl.Int64)
+        for c in existing_cols
+        if c.startswith("h3_r") and schema[c] == pl.UInt64
+    ])
 
-    return df_poi
+    return lf_poi
 
 
-def split_into_tables(df: pl.DataFrame):
+def split_into_tables(lf: pl.LazyFrame):
     """
     Orchestration complète.
+    poi et adresse restent lazy (à exporter en streaming),
+    les tables de catégories sont de petits DataFrames.
     """
-    # 1) Catégories
-    df_main_category, df_sub_category, df = build_category_tables(df)
+    # 1) POI id (sur le scan, avant toute jointure)
+    lf = build_poi_id(lf.lazy())
 
-    # 2) POI id
-    df = build_poi_id(df)
+    # 2) Catégories
+    df_main_category, df_sub_category, lf = build_category_tables(lf)
 
-    # 3) Adresses (avec adresse_id + injection dans df)
-    df_adresse, df = build_adresse_table(df)
+    # 3) Adresses (avec adresse_id + injection dans lf)
+    lf_adresse, lf = build_adresse_table(lf)
 
     # 4) Table POI (avec adresse_id)
-    df_poi = build_poi_table(df)
+    lf_poi = build_poi_table(lf)
 
     return {
-        "poi": df_poi,
-        "adresse": df_adresse,
+        "poi": lf_poi,
+        "adresse": lf_adresse,
         "main_category": df_main_category,
         "sub_category": df_sub_category,
-    }
\ No newline at end of file
+    }
@@ -47,7 +47,7 @@ def normalize_column_name(col: str) -> str:
 
 
 def rename_columns(df: pl.LazyFrame) -> pl.LazyFrame:
-    new_cols = {col: normalize_column_name(col) for col in df.columns}
+    new_cols = {col: normalize_column_name(col) for col in df.collect_schema().names()}
     return df.rename(new_cols)
 
 
@@ -177,25 +177,33 @@ def extract_types(df: pl.LazyFrame) -> pl.LazyFrame:
 
 # extraction du type principal
 def extract_type_principal(df: pl.LazyFrame, mapping_df: pl.DataFrame) -> pl.LazyFrame:
-    exploded = df.explode("types_list")
+    """
+    type_principal = premier label connu (ordre de types_list) de chaque POI.
+    Recherche type_clean -> Label faite dans la liste de chaque ligne
+    (pas d'explode, de jointure ni de group_by sur la table large).
+    Pas de clé de ligne (row index) non plus : après unique() l'ordre des lignes
+    n'est pas stable d'une évaluation du plan à l'autre, une jointure en retour
+    sur l'index pourrait associer le label à une autre ligne.
+    """
+    # type_clean -> Label, première occurrence (comme l'ancienne jointure + first)
+    mapping_df = mapping_df.unique("type_clean", keep="first", maintain_order=True)
 
-    joined = exploded.join(
-        mapping_df,
-        left_on="types_list",
-        right_on="type_clean",
-        how="left"
+    return df.with_columns(
+        pl.col("types_list")
+        .list.eval(
+            pl.element().replace_strict(
+                mapping_df["type_clean"], mapping_df["Label"], default=None, return_dtype=pl.Utf8
+            )
+        )
+        .list.drop_nulls()
+        .list.first()
+        .alias("type_principal")
     )
 
-    aggregated = joined.group_by(df.columns).agg([
-        pl.col("Label").drop_nulls().first().alias("type_principal")
-    ])
-
-    return aggregated
-
 # enrichissement avec main_category / sub_category
 def enrich_with_categories(df: pl.LazyFrame, cat_df: pl.DataFrame) -> pl.LazyFrame:
     return df.join(
-        cat_df,
+        cat_df.lazy(),
         on="type_principal",
         how="left"
     )
@@ -245,12 +253,13 @@ def final_cleanup(df: pl.LazyFrame) -> pl.LazyFrame:
 
     return df
 
-def safe_rename(df: pl.DataFrame) -> pl.DataFrame:
+def safe_rename(df: pl.LazyFrame) -> pl.LazyFrame:
     rename_map = {
         "adresse_postale": "adresse",
     }
 
-    existing = {old: new for old, new in rename_map.items() if old in df.columns}
+    columns = df.collect_schema().names()
+    existing = {old: new for old, new in rename_map.items() if old in columns}
     return df.rename(existing)
 
 
@@ -260,26 +269,59 @@ def safe_rename(df: pl.DataFrame) -> pl.DataFrame:
 def transform(df: pl.LazyFrame) -> pl.LazyFrame:
     """
     Pipeline complet des transformations.
+    Entièrement lazy : aucune collecte ici (plus de comptages intermédiaires),
+    le plan est exécuté une seule fois par le sink final.
     """
     df = rename_columns(df)
     df = strip_all_string_columns(df)
     df = drop_duplicates(df)
 
     # Split code postal / commune / département
-    if "code_postal_et_commune" in df.columns:
+    if "code_postal_et_commune" in df.collect_schema().names():
         df = split_code_postal_commune(df)
 
     # MAPPING
     df = apply_full_mapping(df)
 
     # NETTOYAGE FINAL
-    print('avant drop main et sub', len(df))
     df = drop_null_categories(df)
-    print('apres drop main et sub', len(df))
     df = clean_duplicated(df)
-    print('apres clean duplicated', len(df))
     df = final_cleanup(df)
-    print('apres final cleanup', len(df))
     df = safe_rename(df)
 
-    return df
\ No newline at end of file
+    return df
+
+
+if __name__ == "__main__":
+    import time
+    import numpy as np
+
+    # Benchmark extract_type_principal sur un volume national (~500k POIs)
+    n = 500_000
+    rng = np.random.default_rng(0)
+    mapping_df = load_uri_mapping()
+    types = mapping_df["type_clean"].to_list() + TYPES_A_IGNORER
+
+    df = pl.DataFrame({
+        "nom_du_poi": [f"poi_{i}" for i in range(n)],
+        "description": ["Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8] * n,
+        "adresse_postale": [f"{i} rue de la Paix" for i in range(n)],
+        "latitude": rng.uniform(42.5, 51.0, n),
+        "longitude": rng.uniform(-4.5, 8.0, n),
+        "types_list": [list(rng.choice(types, size=rng.integers(1, 6))) for _ in range(n)],
+    }).lazy()
+
+    # Ancienne version : group_by sur toutes les colonnes de la table
+    start = time.perf_counter()
+    (
+        df.explode("types_list")
+        .join(mapping_df.lazy(), left_on="types_list", right_on="type_clean", how="left")
+        .group_by(df.collect_schema().names())
+        .agg(pl.col("Label").drop_nulls().first().alias("type_principal"))
+        .collect()
+    )
+    print(f"group_by(toutes colonnes) : {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    extract_type_principal(df, mapping_df).collect()
+    print(f"recherche dans la liste (sans group_by) : {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,98 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+DATA_DIR = Path("data")
+ADMIN_INDEX_DIR = DATA_DIR / "processed" / "admin_h3_index"
+
+# Niveau administratif -> résolution H3 (et colonne h3_r* correspondante du dataset)
+LEVEL_RESOLUTION = {
+    "commune": 8,
+    "region": 6,
+}
+
+# Résolution la plus fine du dataset : h3_r8 / h3_r6 y sont les parents de h3_r9,
+# l'index est donc construit à cette résolution puis remonté (cf. geometry_to_cells)
+DATASET_FINEST_RESOLUTION = 9
+
+
+class AdminH3Index:
+    """
+    Index niveau administratif (commune / région) -> cellules H3 couvrant le polygone.
+
+    Stockage binaire compact, par niveau :
+    - {level}_cells.npy : toutes les cellules uint64, concaténées unité par unité,
+      triées à l'intérieur de chaque unité (lu en memory-map : rien n'est chargé
+      tant qu'une unité n'est pas demandée)
+    - {level}_units.json : nom -> liste de [offset, longueur] (homonymes possibles)
+    """
+
+    def __init__(self, index_dir=ADMIN_INDEX_DIR, mmap: bool = True):
+        self.index_dir = Path(index_dir)
+        self.mmap = mmap
+        self._cells: Dict[str, np.ndarray] = {}
+        self._units: Dict[str, dict] = {}
+
+    # -----------------------------
+    # ÉCRITURE
+    # -----------------------------
+
+    @staticmethod
+    def save(index_dir, level: str, cells_by_unit: Dict[str, list]):
+        """
+        cells_by_unit : nom -> cellules (int / uint64). Plusieurs unités de même nom
+        peuvent être fournies sous forme de liste de tableaux.
+        """
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        chunks, units, offset = [], {}, 0
+        for name, unit_cells in cells_by_unit.items():
+            for cells in unit_cells:
+                cells = np.unique(np.asarray(cells, dtype=np.uint64))
+                units.setdefault(name, []).append([offset, len(cells)])
+                chunks.append(cells)
+                offset += len(cells)
+
+        all_cells = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint64)
+        np.save(index_dir / f"{level}_cells.npy", all_cells)
+        (index_dir / f"{level}_units.json").write_text(
+            json.dumps({"resolution": LEVEL_RESOLUTION[level], "units": units}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+
+    # -----------------------------
+    # LECTURE
+    # -----------------------------
+
+    def _load(self, level: str):
+        if level not in self._cells:
+            self._cells[level] = np.load(
+                self.index_dir / f"{level}_cells.npy", mmap_mode="r" if self.mmap else None
+            )
+            self._units[level] = json.loads(
+                (self.index_dir / f"{level}_units.json").read_text(encoding="utf-8")
+            )
+        return self._cells[level], self._units[level]
+
+    def resolution(self, level: str) -> int:
+        return self._load(level)[1]["resolution"]
+
+    def names(self, level: str):
+        return list(self._load(level)[1]["units"])
+
+    def cells(self, level: str, name: str) -> Optional[np.ndarray]:
+        """
+        Cellules triées (uint64) couvrant l'unité `name`, None si inconnue.
+        Une seule unité : vue sur le memory-map (pas de copie).
+        """
+        all_cells, meta = self._load(level)
+        spans = meta["units"].get(name)
+        if not spans:
+            return None
+        if len(spans) == 1:
+            offset, length = spans[0]
+            return all_cells[offset:offset + length]
+        return np.unique(np.concatenate([all_cells[o:o + n] for o, n in spans]))
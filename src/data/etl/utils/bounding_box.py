@@ -1,5 +1,8 @@
 import geopandas as gpd
-from shapely.geometry import Point
+import numpy as np
+import polars as pl
+import shapely
+from shapely.strtree import STRtree
 from pathlib import Path
 
 DATA_DIR = Path("data")
@@ -7,26 +10,50 @@ REGIONS_PATH = DATA_DIR / "processed" / "regions.parquet"
 DEPARTEMENTS_PATH = DATA_DIR / "processed" / "departements.parquet"
 COMMUNES_PATH = DATA_DIR / "processed" / "communes.parquet"
 
-class BoundingBoxResolver:
-    def __init__(self, 
-                 regions_path=REGIONS_PATH,
-                 departements_path=DEPARTEMENTS_PATH,
-                 communes_path=COMMUNES_PATH):
-        
-        self.regions = gpd.read_parquet(Path(regions_path))
-        self.departements = gpd.read_parquet(Path(departements_path))
-        self.communes = gpd.read_parquet(Path(communes_path))
 
+class _AdminLayer:
+    """
+    Couche administrative chargée à la demande, avec ses index :
+    - nom -> position (première occurrence, comme l'ancien filtre + iloc[0])
+    - tableaux numpy des bbox / centroïdes
+    - STRtree des géométries (construit au premier test spatial)
+    """
 
-    # ---------------------------
-    # REGION
-    # ---------------------------
+    def __init__(self, path):
+        self.path = Path(path)
+        self._gdf = None
+        self._positions = None
+        self._tree = None
 
-    def get_region_bbox(self, region_name):
-        row = self.regions[self.regions["nom"] == region_name]
-        if row.empty:
+    @property
+    def gdf(self) -> gpd.GeoDataFrame:
+        if self._gdf is None:
+            self._gdf = gpd.read_parquet(self.path)
+        return self._gdf
+
+    @property
+    def positions(self) -> dict:
+        if self._positions is None:
+            positions = {}
+            for i, name in enumerate(self.gdf["nom"].tolist()):
+                positions.setdefault(name, i)
+            self._positions = positions
+        return self._positions
+
+    @property
+    def tree(self) -> STRtree:
+        if self._tree is None:
+            self._tree = STRtree(self.gdf.geometry.values)
+        return self._tree
+
+    def position(self, name):
+        return self.positions.get(name)
+
+    def bbox(self, name):
+        i = self.position(name)
+        if i is None:
             return None
-        r = row.iloc[0]
+        r = self.gdf.iloc[i]
         return {
             "lat_min": r.lat_min,
             "lat_max": r.lat_max,
@@ -34,54 +61,173 @@ class BoundingBoxResolver:
             "lon_max": r.lon_max
         }
 
-    def get_region_centroid(self, region_name):
-        row = self.regions[self.regions["nom"] == region_name]
-        if row.empty:
+    def centroid(self, name):
+        i = self.position(name)
+        if i is None:
             return None
-        r = row.iloc[0]
+        r = self.gdf.iloc[i]
         return (r.centroid_lat, r.centroid_lon)
 
-    def poi_in_region(self, latitude, longitude, region_name):
-        row = self.regions[self.regions["nom"] == region_name]
-        if row.empty:
+    def contains(self, latitude, longitude, name) -> bool:
+        i = self.position(name)
+        if i is None:
             return False
-        polygon = row.iloc[0].geometry
-        return polygon.contains(Point(longitude, latitude))
+        return bool(shapely.contains_xy(self.gdf.geometry.iloc[i], longitude, latitude))
+
+    def centroids(self, names):
+        """(latitudes, longitudes) float pour une liste de noms, NaN si inconnu."""
+        positions = np.array([self.positions.get(name, -1) for name in names], dtype=np.int64)
+        known = positions >= 0
+
+        latitudes = np.full(len(positions), np.nan)
+        longitudes = np.full(len(positions), np.nan)
+        latitudes[known] = self.gdf["centroid_lat"].to_numpy(dtype=float)[positions[known]]
+        longitudes[known] = self.gdf["centroid_lon"].to_numpy(dtype=float)[positions[known]]
+        return latitudes, longitudes
+
+    def locate(self, latitudes, longitudes) -> np.ndarray:
+        """
+        Position (dans la couche) du polygone contenant chaque point, -1 sinon.
+        Requête groupée sur le STRtree ; si un point est sur une frontière commune
+        à deux polygones, le premier est retenu.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        result = np.full(len(latitudes), -1, dtype=np.int64)
+
+        valid = np.flatnonzero(np.isfinite(latitudes) & np.isfinite(longitudes))
+        if len(valid) == 0:
+            return result
+
+        points = shapely.points(longitudes[valid], latitudes[valid])
+        point_idx, poly_idx = self.tree.query(points, predicate="intersects")
+
+        # première correspondance par point (ordre des polygones dans la couche)
+        order = np.lexsort((poly_idx, point_idx))
+        point_idx, poly_idx = point_idx[order], poly_idx[order]
+        first = np.unique(point_idx, return_index=True)[1]
+        result[valid[point_idx[first]]] = poly_idx[first]
+        return result
+
+
+class BoundingBoxResolver:
+    """
+    Accès aux couches régions / départements / communes (IGN).
+    Les parquets ne sont lus qu'au premier accès à une couche ; les recherches
+    par nom passent par un dictionnaire, les tests spatiaux par un STRtree.
+    """
+
+    def __init__(self,
+                 regions_path=REGIONS_PATH,
+                 departements_path=DEPARTEMENTS_PATH,
+                 communes_path=COMMUNES_PATH):
+
+        self.layers = {
+            "region": _AdminLayer(regions_path),
+            "departement": _AdminLayer(departements_path),
+            "commune": _AdminLayer(communes_path),
+        }
+
+    @property
+    def regions(self) -> gpd.GeoDataFrame:
+        return self.layers["region"].gdf
+
+    @property
+    def departements(self) -> gpd.GeoDataFrame:
+        return self.layers["departement"].gdf
+
+    @property
+    def communes(self) -> gpd.GeoDataFrame:
+        return self.layers["commune"].gdf
+
+    # ---------------------------
+    # REGION
+    # ---------------------------
+
+    def get_region_bbox(self, region_name):
+        return self.layers["region"].bbox(region_name)
+
+    def get_region_centroid(self, region_name):
+        return self.layers["region"].centroid(region_name)
+
+    def poi_in_region(self, latitude, longitude, region_name):
+        return self.layers["region"].contains(latitude, longitude, region_name)
 
     # ---------------------------
     # CITY
     # ---------------------------
 
     def get_city_bbox(self, city_name):
-        row = self.communes[self.communes["nom"] == city_name]
-        if row.empty:
-            return None
-        r = row.iloc[0]
-        return {
-            "lat_min": r.lat_min,
-            "lat_max": r.lat_max,
-            "lon_min": r.lon_min,
-            "lon_max": r.lon_max
-        }
+        return self.layers["commune"].bbox(city_name)
 
     def get_city_centroid(self, city_name):
-        row = self.communes[self.communes["nom"] == city_name]
-        if row.empty:
-            return None
-        r = row.iloc[0]
-        return (r.centroid_lat, r.centroid_lon)
+        return self.layers["commune"].centroid(city_name)
 
     def poi_in_city(self, latitude, longitude, city_name):
-        row = self.communes[self.communes["nom"] == city_name]
-        if row.empty:
-            return False
-        polygon = row.iloc[0].geometry
-        return polygon.contains(Point(longitude, latitude))
-    
+        return self.layers["commune"].contains(latitude, longitude, city_name)
+
+    # ---------------------------
+    # BATCH
+    # ---------------------------
+
+    def get_centroids(self, names, level: str = "commune"):
+        """Centroïdes (latitudes, longitudes) pour une liste de noms, NaN si inconnu."""
+        return self.layers[level].centroids(names)
+
+    def centroids_frame(self, level: str = "commune") -> pl.DataFrame:
+        """
+        Table {level}, centroid_lat, centroid_lon de toute la couche
+        (première occurrence par nom, centroïdes manquants écartés).
+        """
+        layer = self.layers[level]
+        names = list(layer.positions)
+        latitudes, longitudes = layer.centroids(names)
+
+        return (
+            pl.DataFrame({level: names, "centroid_lat": latitudes, "centroid_lon": longitudes})
+            .with_columns(pl.col(level).cast(pl.Utf8))
+            .with_columns(pl.col("centroid_lat", "centroid_lon").fill_nan(None))
+            .drop_nulls(["centroid_lat", "centroid_lon"])
+        )
+
+    def locate_points(self, latitudes, longitudes, level: str = "commune", column: str = "nom") -> np.ndarray:
+        """
+        Valeur de `column` (nom, code INSEE...) du polygone contenant chaque point,
+        None si aucun.
+        """
+        layer = self.layers[level]
+        positions = layer.locate(latitudes, longitudes)
+        values = layer.gdf[column].to_numpy(dtype=object)
+        return np.where(positions >= 0, values[np.maximum(positions, 0)], None)
+
 
 # test
 if __name__ == "__main__":
+    import time
+
     resolver = BoundingBoxResolver()
     print(resolver.get_city_centroid("Hermival-les-Vaux"))
     print(resolver.poi_in_city(45.75, 4.85, "Lyon"))
-    print(resolver.get_region_bbox("Île-de-France"))
\ No newline at end of file
+    print(resolver.get_region_bbox("Île-de-France"))
+
+    names = resolver.communes["nom"].tolist()
+
+    start = time.perf_counter()
+    for name in names[:1000]:
+        resolver.communes[resolver.communes["nom"] == name]
+    print(f"1000 recherches par scan : {time.perf_counter() - start:.3f} s")
+
+    start = time.perf_counter()
+    for name in names[:1000]:
+        resolver.get_city_centroid(name)
+    print(f"1000 recherches indexées : {time.perf_counter() - start:.3f} s")
+
+    start = time.perf_counter()
+    resolver.get_centroids(names)
+    print(f"{len(names)} centroïdes en batch : {time.perf_counter() - start:.3f} s")
+
+    rng = np.random.default_rng(0)
+    latitudes, longitudes = rng.uniform(42.5, 51.0, 100_000), rng.uniform(-4.5, 8.0, 100_000)
+    start = time.perf_counter()
+    resolver.locate_points(latitudes, longitudes)
+    print(f"100k points localisés (STRtree) : {time.perf_counter() - start:.3f} s")
@@ -1,69 +1,31 @@
 #!/usr/bin/env python3
-import json
 from pathlib import Path
 
+from admin_index import ADMIN_INDEX_DIR, DATASET_FINEST_RESOLUTION, LEVEL_RESOLUTION, AdminH3Index
 from bounding_box import BoundingBoxResolver
-from h3_utils import polygon_to_cells
+from h3_utils import geometry_to_cells
 
 DATA_DIR = Path("data")
 GEOJSON_COMMUNES = DATA_DIR / "raw" / "communes-100m.geojson"
-ADMIN_HEXES_PATH = DATA_DIR / "processed" / "admin_hexes.json"
 
 # ---------------------------------------------------------
-# Communes → H3
+# Polygones → H3
 # ---------------------------------------------------------
 
-def build_communes_hex(resolver, res=8):
+def build_admin_cells(gdf, res):
+    """
+    nom -> liste de tableaux de cellules (un par polygone : les homonymes
+    restent des unités distinctes dans l'index).
+    Couverture calculée en r9 puis remontée à res, comme h3_r* dans le dataset :
+    tout POI du polygone a sa cellule dans l'index.
+    """
     results = {}
 
-    for _, row in resolver.communes.iterrows():
-        name = row["nom"]
-
-        # Récupérer le polygone bounding box
-        bbox = resolver.get_city_bbox(name)
-        if bbox is None:
+    for name, geometry in zip(gdf["nom"], gdf.geometry):
+        if geometry is None or geometry.is_empty:
             continue
 
-        # Convertir dict bbox → liste de tuples (latitude, longitude)
-        polygon = [
-            (bbox["lat_min"], bbox["lon_min"]),
-            (bbox["lat_min"], bbox["lon_max"]),
-            (bbox["lat_max"], bbox["lon_max"]),
-            (bbox["lat_max"], bbox["lon_min"]),
-            (bbox["lat_min"], bbox["lon_min"]),
-        ]
-
-        # Convertir en H3
-        hexes = polygon_to_cells(polygon, res)
-        results[name] = hexes
-
-    return results
-
-
-# ---------------------------------------------------------
-# Régions → H3
-# ---------------------------------------------------------
-
-def build_regions_hex(resolver, res=6):
-    results = {}
-
-    for _, row in resolver.regions.iterrows():
-        name = row["nom"]
-
-        bbox = resolver.get_region_bbox(name)
-        if bbox is None:
-            continue
-
-        polygon = [
-            (bbox["lat_min"], bbox["lon_min"]),
-            (bbox["lat_min"], bbox["lon_max"]),
-            (bbox["lat_max"], bbox["lon_max"]),
-            (bbox["lat_max"], bbox["lon_min"]),
-            (bbox["lat_min"], bbox["lon_min"]),
-        ]
-
-        hexes = polygon_to_cells(polygon, res)
-        results[name] = hexes
+        results.setdefault(name, []).append(geometry_to_cells(geometry, res, from_res=DATASET_FINEST_RESOLUTION))
 
     return results
 
@@ -77,23 +39,17 @@ def main():
     print("Chargement des parquets...")
     resolver = BoundingBoxResolver()
 
-    print("Génération des hexagones communes...")
-    communes_hex = build_communes_hex(resolver, res=8)
-
-    print("Génération des hexagones régions...")
-    regions_hex = build_regions_hex(resolver, res=6)
-
-    print("Sauvegarde dans admin_hexes.json...")
-    out = {
-        "commune": communes_hex,
-        "region": regions_hex
-    }
+    print("Génération des hexagones communes (polygones)...")
+    communes_cells = build_admin_cells(resolver.communes, res=LEVEL_RESOLUTION["commune"])
+    AdminH3Index.save(ADMIN_INDEX_DIR, "commune", communes_cells)
 
-    with open(ADMIN_HEXES_PATH, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False)
+    print("Génération des hexagones régions (polygones)...")
+    regions_cells = build_admin_cells(resolver.regions, res=LEVEL_RESOLUTION["region"])
+    AdminH3Index.save(ADMIN_INDEX_DIR, "region", regions_cells)
 
+    print(f"Index sauvegardé dans {ADMIN_INDEX_DIR}")
     print("Terminé !")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,42 @@
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+
+# Dataset Parquet partitionné façon hive : <dataset>/region=<valeur>/part-0.parquet
+# + index des communes à côté du dataset : <dataset>_communes.parquet
+# (hors du répertoire : un fichier sans colonnes de partition casserait le scan hive)
+PARTITION_COLS = ("region",)
+SORT_COL = "h3_r8"
+ROW_GROUP_SIZE = 50_000
+HIVE_NULL = "__HIVE_DEFAULT_PARTITION__"
+COMMUNE_INDEX_SUFFIX = "_communes.parquet"
+
+
+def commune_index_path(dataset_dir) -> Path:
+    dataset_dir = Path(dataset_dir)
+    return dataset_dir.with_name(dataset_dir.name + COMMUNE_INDEX_SUFFIX)
+
+
+def is_parquet_dataset(path) -> bool:
+    return Path(path).is_dir()
+
+
+def scan_pois(path) -> pl.LazyFrame:
+    """Scan d'un Parquet monolithique ou d'un dataset partitionné (hive)."""
+    if is_parquet_dataset(path):
+        return pl.scan_parquet(Path(path), hive_partitioning=True)
+    return pl.scan_parquet(path)
+
+
+def load_commune_index(path) -> Optional[pl.DataFrame]:
+    """
+    Index des communes d'un dataset partitionné :
+    colonnes de partition, commune, h3_min, h3_max, n_pois. None si absent.
+    """
+    if not is_parquet_dataset(path):
+        return None
+    index_path = commune_index_path(path)
+    if not index_path.exists():
+        return None
+    return pl.read_parquet(index_path)
@@ -0,0 +1,109 @@
+from typing import Union
+
+import numpy as np
+import polars as pl
+
+EARTH_RADIUS_KM = 6371.0
+
+
+# ---------------------------------------------------------
+# Haversine vectorisé (NumPy)
+# ---------------------------------------------------------
+def haversine_np(latitude1, longitude1, latitude2, longitude2) -> np.ndarray:
+    """
+    Distance grand cercle (km) entre deux ensembles de points, en degrés.
+    Les entrées suivent le broadcasting NumPy (scalaires, vecteurs ou matrices).
+    """
+    latitude1, longitude1, latitude2, longitude2 = map(
+        np.radians, (latitude1, longitude1, latitude2, longitude2)
+    )
+    dlat = latitude2 - latitude1
+    dlongitude = longitude2 - longitude1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(latitude1) * np.cos(latitude2) * np.sin(dlongitude / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix_km(src_coords, dst_coords) -> np.ndarray:
+    """
+    Matrice des distances (km) len(src) x len(dst).
+    src_coords / dst_coords : séquences ou tableaux (latitude, longitude).
+    """
+    src = np.asarray(src_coords, dtype=float).reshape(-1, 2)
+    dst = np.asarray(dst_coords, dtype=float).reshape(-1, 2)
+    return haversine_np(src[:, 0, None], src[:, 1, None], dst[None, :, 0], dst[None, :, 1])
+
+
+# ---------------------------------------------------------
+# Haversine en expressions Polars natives
+# ---------------------------------------------------------
+def haversine_expr(
+    latitude1: Union[str, pl.Expr],
+    longitude1: Union[str, pl.Expr],
+    latitude2: Union[str, pl.Expr],
+    longitude2: Union[str, pl.Expr],
+) -> pl.Expr:
+    """
+    Distance grand cercle (km) entre deux couples de colonnes (noms ou expressions),
+    en degrés. Expression Polars pure (pas de UDF Python) : utilisable dans un
+    LazyFrame (optimisation de requête, streaming). Les null se propagent.
+    """
+    latitude1, longitude1, latitude2, longitude2 = (
+        (pl.col(c) if isinstance(c, str) else c).radians()
+        for c in (latitude1, longitude1, latitude2, longitude2)
+    )
+
+    a = (
+        ((latitude2 - latitude1) / 2).sin().pow(2)
+        + latitude1.cos() * latitude2.cos() * ((longitude2 - longitude1) / 2).sin().pow(2)
+    )
+    return 2 * EARTH_RADIUS_KM * a.clip(0.0, 1.0).sqrt().arcsin()
+
+
+if __name__ == "__main__":
+    import math
+    import time
+
+    def _haversine_single(latitude1, longitude1, latitude2, longitude2):
+        latitude1, longitude1, latitude2, longitude2 = map(math.radians, [latitude1, longitude1, latitude2, longitude2])
+        a = (
+            math.sin((latitude2 - latitude1) / 2) ** 2
+            + math.cos(latitude1) * math.cos(latitude2) * math.sin((longitude2 - longitude1) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    n = 1_000_000
+    rng = np.random.default_rng(42)
+    df = pl.DataFrame({
+        "latitude": rng.uniform(42.0, 51.0, n),
+        "longitude": rng.uniform(-5.0, 8.0, n),
+        "cluster_latitude": rng.uniform(42.0, 51.0, n),
+        "cluster_longitude": rng.uniform(-5.0, 8.0, n),
+    })
+    cols = ["latitude", "longitude", "cluster_latitude", "cluster_longitude"]
+
+    # Ancienne version : struct + map_elements (une lambda Python par ligne)
+    start = time.perf_counter()
+    ref = df.select(
+        pl.struct(cols).map_elements(lambda s: _haversine_single(*(s[c] for c in cols)), return_dtype=pl.Float64)
+    ).to_series()
+    t_udf = time.perf_counter() - start
+
+    # Expression native (eager)
+    start = time.perf_counter()
+    res = df.select(haversine_expr(*cols)).to_series()
+    t_expr = time.perf_counter() - start
+
+    # Expression native dans un LazyFrame (filtre fusionné)
+    start = time.perf_counter()
+    df.lazy().filter(haversine_expr(*cols) <= 200.0).collect()
+    t_lazy = time.perf_counter() - start
+
+    # NumPy
+    start = time.perf_counter()
+    haversine_np(*(df[c].to_numpy() for c in cols))
+    t_np = time.perf_counter() - start
+
+    print(f"écart max : {(ref - res).abs().max():.2e} km")
+    for name, t in [("map_elements", t_udf), ("expr Polars", t_expr), ("expr Polars lazy+filter", t_lazy), ("NumPy", t_np)]:
+        print(f"{name:<24} : {t * 1000:>9.1f} ms | {n / t / 1e6:>8.2f} M lignes/s")
@@ -1,13 +1,170 @@
+import re
+
 import h3
+import numpy as np
+import polars as pl
+from concurrent.futures import ProcessPoolExecutor
 from h3 import LatLngPoly
-from typing import List, Tuple
+from h3.api import basic_int as h3_int
+from multiprocessing import get_context
+from typing import List, Optional, Tuple
 
 LatLon = Tuple[float, float]
 
+# Layout d'un index H3 (cellule) sur 64 bits :
+# bits 52-55 = résolution, puis 15 digits de 3 bits (res 1 -> 15), 7 = digit inutilisé
+H3_RES_OFFSET = 52
+H3_RES_MASK = np.uint64(0xF << H3_RES_OFFSET)
+H3_MAX_RES = 15
+H3_DIGIT_BITS = 3
+H3_NULL = 0  # index invalide (coordonnées manquantes)
+
+# Colonnes H3 du dataset : h3_r6, h3_r7, h3_r8, h3_r9
+H3_COLUMN_PATTERN = re.compile(r"h3_r\d+")
+
 def latlon_to_h3_str(latitude: float, longitude: float, res: int) -> str:
     return h3.latlng_to_cell(latitude, longitude, res)
 
 def polygon_to_cells(polygon: List[LatLon], res: int) -> List[str]:
  
     cells_int = h3.polygon_to_cells(LatLngPoly(polygon), res)
-    return [c for c in cells_int]
\ No newline at end of file
+    return [c for c in cells_int]
+
+
+def geometry_to_cells(geometry, res: int, from_res: Optional[int] = None) -> np.ndarray:
+    """
+    Cellules H3 (uint64 triées) couvrant un Polygon / MultiPolygon shapely (lon, lat).
+    Les cellules de bord sont incluses dès qu'elles intersectent le polygone
+    (mode "overlap"), pas seulement celles dont le centre est à l'intérieur :
+    une petite commune a toujours au moins une cellule.
+    from_res : couverture calculée à cette résolution plus fine puis remontée à res
+    (cell_to_parent), comme les colonnes h3_r* du dataset dérivées de la plus fine.
+    """
+    cover_res = res if from_res is None else max(from_res, res)
+    shape = h3.geo_to_h3shape(geometry.__geo_interface__)
+    try:
+        cells = h3_int.h3shape_to_cells_experimental(shape, cover_res, contain="overlap")
+    except AttributeError:
+        # h3 < 4.1 : centres inclus + cellules des sommets du contour
+        cells = set(h3_int.h3shape_to_cells(shape, cover_res))
+        polygons = getattr(geometry, "geoms", [geometry])
+        for polygon in polygons:
+            cells.update(
+                h3_int.latlng_to_cell(latitude, longitude, cover_res)
+                for longitude, latitude in polygon.exterior.coords
+            )
+    cells = np.fromiter(cells, dtype=np.uint64)
+    if cover_res != res:
+        cells = cell_to_parent_np(cells, res)
+    return np.unique(cells)
+
+
+# ---------------------------------------------------------
+# Indexation vectorisée (uint64)
+# ---------------------------------------------------------
+def _latlng_to_cells_chunk(latitudes: np.ndarray, longitudes: np.ndarray, res: int) -> np.ndarray:
+    out = np.zeros(len(latitudes), dtype=np.uint64)
+    valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+    out[valid] = [
+        h3_int.latlng_to_cell(latitude, longitude, res)
+        for latitude, longitude in zip(latitudes[valid].tolist(), longitudes[valid].tolist())
+    ]
+    return out
+
+
+def latlng_to_cells_np(
+    latitudes,
+    longitudes,
+    res: int,
+    n_jobs: int = 1,
+    chunk_size: int = 500_000,
+) -> np.ndarray:
+    """
+    Cellules H3 (uint64) pour des tableaux de latitudes / longitudes.
+    NaN / null -> H3_NULL (0).
+    n_jobs > 1 : découpage en chunks répartis sur un pool de processus (spawn).
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+
+    if n_jobs <= 1 or len(latitudes) <= chunk_size:
+        return _latlng_to_cells_chunk(latitudes, longitudes, res)
+
+    bounds = range(0, len(latitudes), chunk_size)
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context("spawn")) as pool:
+        chunks = pool.map(
+            _latlng_to_cells_chunk,
+            [latitudes[i:i + chunk_size] for i in bounds],
+            [longitudes[i:i + chunk_size] for i in bounds],
+            [res] * len(bounds),
+        )
+        return np.concatenate(list(chunks))
+
+
+def cell_to_parent_np(cells: np.ndarray, parent_res: int) -> np.ndarray:
+    """
+    Équivalent vectorisé de h3.cell_to_parent sur des uint64 :
+    on réécrit la résolution et on met à 7 les digits plus fins que parent_res.
+    Les H3_NULL restent à 0.
+    """
+    cells = np.asarray(cells, dtype=np.uint64)
+    unused_digits = np.uint64((1 << (H3_DIGIT_BITS * (H3_MAX_RES - parent_res))) - 1)
+    parents = (cells & ~H3_RES_MASK) | np.uint64(parent_res << H3_RES_OFFSET) | unused_digits
+    return np.where(cells == H3_NULL, np.uint64(H3_NULL), parents)
+
+
+def cell_to_parent_expr(cells: pl.Expr, parent_res: int) -> pl.Expr:
+    """Même calcul que cell_to_parent_np en expression Polars (UInt64, null conservé)."""
+    unused_digits = (1 << (H3_DIGIT_BITS * (H3_MAX_RES - parent_res))) - 1
+    keep_mask = ((1 << 64) - 1) ^ (0xF << H3_RES_OFFSET)
+    return (
+        (cells & pl.lit(keep_mask, dtype=pl.UInt64))
+        | pl.lit((parent_res << H3_RES_OFFSET) | unused_digits, dtype=pl.UInt64)
+    )
+
+
+# ---------------------------------------------------------
+# Conversions uint64 <-> chaînes hexadécimales
+# ---------------------------------------------------------
+def cells_to_str(cells: pl.Series) -> pl.Series:
+    """uint64 -> chaînes H3 (conversion faite une fois par cellule distincte)."""
+    unique = cells.drop_nulls().unique()
+    mapping = dict(zip(unique.to_list(), (h3_int.int_to_str(c) for c in unique.to_list())))
+    return cells.replace_strict(mapping, default=None, return_dtype=pl.String)
+
+
+def str_to_cells(cells):
+    """
+    Chaînes H3 -> uint64 (Series ou Expr). Natif : l'index H3 est l'entier
+    écrit en hexadécimal. Chaîne invalide -> null.
+    """
+    return cells.str.to_integer(base=16, strict=False).cast(pl.UInt64)
+
+
+def _h3_columns(lf, dtype) -> List[str]:
+    return [
+        col for col, col_dtype in lf.collect_schema().items()
+        if H3_COLUMN_PATTERN.fullmatch(col) and col_dtype == dtype
+    ]
+
+
+def h3_columns_to_uint64(lf):
+    """
+    Convertit les colonnes h3_r* encore stockées en chaînes (anciens Parquet)
+    en uint64. Sans effet si elles le sont déjà. DataFrame ou LazyFrame.
+    """
+    cols = _h3_columns(lf, pl.String)
+    if not cols:
+        return lf
+    return lf.with_columns([str_to_cells(pl.col(col)).alias(col) for col in cols])
+
+
+def h3_columns_to_str(lf):
+    """Inverse de h3_columns_to_uint64 (affichage, exports externes)."""
+    cols = _h3_columns(lf, pl.UInt64)
+    if not cols:
+        return lf
+    return lf.with_columns([
+        pl.col(col).map_batches(cells_to_str, return_dtype=pl.String, is_elementwise=True)
+        for col in cols
+    ])
@@ -1,4 +1,10 @@
+import hashlib
+import json
+import os
 import time
+from pathlib import Path
+from typing import Tuple
+
 import requests
 
 def download_with_retry(url: str, retries: int = 3, timeout: int = 30) -> bytes:
@@ -10,4 +16,176 @@ def download_with_retry(url: str, retries: int = 3, timeout: int = 30) -> bytes:
         except Exception as e:
             if attempt == retries:
                 raise
-            time.sleep(2 * attempt)
\ No newline at end of file
+            time.sleep(2 * attempt)
+
+
+# ---------------------------------------------------------
+# Téléchargement en streaming vers un cache local
+# ---------------------------------------------------------
+# Organisation du cache :
+#   objects/<sha256>.<ext>   contenu (adressé par son empreinte)
+#   refs/<sha1(url)>.json    url, etag, last_modified, sha256, size
+#   partial/<sha1(url)>.part téléchargement interrompu (+ .json : etag / last_modified)
+
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 Mo
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _read_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _write_json(path: Path, data: dict):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _if_range(meta: dict):
+    """Valeur de If-Range : ETag de préférence, sinon Last-Modified."""
+    return meta.get("etag") or meta.get("last_modified")
+
+
+def _partial_complete(response: requests.Response, part_meta: dict, offset: int) -> bool:
+    """
+    Réponse 416 à une reprise : le fichier partiel est déjà complet si la taille
+    annoncée (Content-Range: bytes */<taille>) vaut offset et si les validateurs
+    renvoyés par le serveur correspondent à ceux du partiel.
+    """
+    content_range = response.headers.get("Content-Range", "")
+    try:
+        total = int(content_range.rsplit("/", 1)[1])
+    except (IndexError, ValueError):
+        return False
+    if total != offset:
+        return False
+
+    for header, key in (("ETag", "etag"), ("Last-Modified", "last_modified")):
+        value = response.headers.get(header)
+        if value is not None and value != part_meta.get(key):
+            return False
+    return True
+
+
+def _stream_to_part(url: str, part_path: Path, part_meta_path: Path, timeout: int) -> dict:
+    """
+    Télécharge url dans part_path, en reprenant (Range) un fichier partiel existant
+    si le serveur confirme qu'il n'a pas changé (If-Range).
+    Retourne les validateurs du contenu téléchargé (etag, last_modified).
+    """
+    headers = {}
+    part_meta = _read_json(part_meta_path)
+    offset = part_path.stat().st_size if part_path.exists() else 0
+
+    if offset > 0 and _if_range(part_meta):
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = _if_range(part_meta)
+    else:
+        offset = 0
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        # 416 : plage au-delà de la fin -> partiel déjà complet (processus interrompu
+        # avant os.replace), ou contenu raccourci : on repart de zéro
+        if response.status_code == 416 and offset > 0:
+            if _partial_complete(response, part_meta, offset):
+                return part_meta
+            part_path.unlink(missing_ok=True)
+            part_meta_path.unlink(missing_ok=True)
+            return _stream_to_part(url, part_path, part_meta_path, timeout)
+
+        response.raise_for_status()
+
+        # 206 : reprise acceptée ; 200 : contenu changé ou Range ignoré -> on repart de zéro
+        mode = "ab" if response.status_code == 206 else "wb"
+        if mode == "wb":
+            part_meta = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+        _write_json(part_meta_path, part_meta)
+
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+
+        return part_meta
+
+
+def download_to_cache(
+    url: str,
+    cache_dir,
+    suffix: str = ".parquet",
+    retries: int = 3,
+    timeout: int = 30,
+) -> Tuple[Path, bool]:
+    """
+    Télécharge url dans le cache (streaming disque, pas de bytes en mémoire).
+    - requête conditionnelle (If-None-Match / If-Modified-Since) : 304 -> fichier
+      en cache réutilisé sans rien télécharger
+    - reprise HTTP Range d'un téléchargement interrompu
+    Retourne (chemin local, changed) ; changed=False si le contenu n'a pas changé.
+    """
+    cache_dir = Path(cache_dir)
+    for sub in ("objects", "refs", "partial"):
+        (cache_dir / sub).mkdir(parents=True, exist_ok=True)
+
+    key = _url_key(url)
+    ref_path = cache_dir / "refs" / f"{key}.json"
+    part_path = cache_dir / "partial" / f"{key}.part"
+    part_meta_path = cache_dir / "partial" / f"{key}.json"
+
+    for attempt in range(1, retries + 1):
+        try:
+            ref = _read_json(ref_path)
+            cached = cache_dir / "objects" / f"{ref['sha256']}{suffix}" if ref else None
+
+            # 1) Contenu inchangé ?
+            if cached is not None and cached.exists():
+                headers = {}
+                if ref.get("etag"):
+                    headers["If-None-Match"] = ref["etag"]
+                if ref.get("last_modified"):
+                    headers["If-Modified-Since"] = ref["last_modified"]
+
+                if headers:
+                    response = requests.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+                    if response.status_code == 304:
+                        return cached, False
+
+            # 2) Téléchargement (ou reprise) en streaming
+            validators = _stream_to_part(url, part_path, part_meta_path, timeout)
+
+            # 3) Empreinte du contenu -> objet du cache
+            digest = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+
+            object_path = cache_dir / "objects" / f"{sha256}{suffix}"
+            os.replace(part_path, object_path)
+            part_meta_path.unlink(missing_ok=True)
+
+            _write_json(ref_path, {
+                "url": url,
+                "etag": validators.get("etag"),
+                "last_modified": validators.get("last_modified"),
+                "sha256": sha256,
+                "size": object_path.stat().st_size,
+            })
+
+            return object_path, ref.get("sha256") != sha256
+
+        except requests.exceptions.RequestException:
+            # le fichier partiel est conservé pour la tentative suivante,
+            # puis supprimé après la dernière pour ne pas bloquer les runs suivants
+            if attempt == retries:
+                part_path.unlink(missing_ok=True)
+                part_meta_path.unlink(missing_ok=True)
+                raise
+            time.sleep(2 * attempt)
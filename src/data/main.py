@@ -1,47 +1,57 @@
 from etl.extract import extract_all
 from etl.merge import merge_dataframes
 from etl.transform import transform
-from etl.save import save_parquet, save_tables_csv
-from etl.embedding.h3_indexer import add_h3_columns
+from etl.save import OUTPUT_DIR, sink_parquet, save_tables_csv, write_parquet_dataset
+from etl.incremental import (
+    add_source_hash,
+    add_global_scores,
+    enrich_rows,
+    incremental_update,
+    latest_snapshot,
+    write_source_hashes,
+)
+from etl.scoring.cell_aggregates import CellAggregates
 from etl.scoring.density import add_density
-from etl.scoring.proximity import add_proximity
 from etl.scoring.diversity import add_diversity
-from etl.scoring.category_weight import add_category_weight
-from etl.scoring.opening_hours import add_opening_hours_score
-from etl.scoring.popularity import add_popularity
-from etl.scoring.final_score import add_final_score
 from etl.utils.bounding_box import BoundingBoxResolver
 from etl.embedding.embeddings import build_text_embedding_column, add_embeddings
 
 
+import sys
 import time
+import polars as pl
+from pathlib import Path
 
 
-def main():
+def main(full: bool = False, n_jobs: int = 1):
+    """
+    full=False : si un snapshot précédent utilisable existe, seules les lignes
+    sources nouvelles ou modifiées sont transformées et scorées (etl.incremental).
+    n_jobs > 1 : indexation H3 (résolution la plus fine) répartie sur n_jobs processus ;
+    n_jobs = 1 garde l'exécution streaming par batches.
+    """
     resolver = BoundingBoxResolver()
     start_total = time.perf_counter()
 
-    df_list = extract_all()
-    df = merge_dataframes(df_list)
-    df = transform(df)
+    # Sources fusionnées (lazy) + empreinte de chaque ligne normalisée
+    source = add_source_hash(merge_dataframes(extract_all()))
 
-    print(df.head())
-    print(f"Total rows: {df.shape[0]}")
-
-    # add h3 column for location filtering
-    df = add_h3_columns(df, latitude_col="latitude", longitude_col="longitude")
-
-    # scoring
-    df = (
-        df
-        .pipe(add_density, level="commune")
-        .pipe(add_diversity, level="commune")
-        .pipe(add_popularity)
-        .pipe(add_proximity, resolver, level="commune")
-        .pipe(add_category_weight)
-        .pipe(add_opening_hours_score)
-        .pipe(add_final_score)
-    )
+    previous = None if full else latest_snapshot(OUTPUT_DIR)
+    aggregates = None
+    if previous is not None:
+        print(f"[incremental] snapshot précédent : {previous}")
+        lf, aggregates = incremental_update(source, previous, resolver, level="commune", n_jobs=n_jobs)
+    else:
+        # Plan lazy unique : transformations + H3 + codes INSEE + scoring,
+        # exécuté une seule fois en streaming par le sink final
+        lf = transform(source)
+        lf = enrich_rows(lf, resolver, level="commune", n_jobs=n_jobs)
+        lf = (
+            lf
+            .pipe(add_density, level="commune")
+            .pipe(add_diversity, level="commune")
+        )
+        lf = add_global_scores(lf)
 
     # Construire la Colonne texte riche
     #df = build_text_embedding_column(df)
@@ -49,12 +59,27 @@ def main():
     # Ajouter les embeddings
     #df = add_embeddings(df)
 
-    # Save final dataset in parquet and csv
-    save_parquet(df)
-    save_tables_csv(df)
+    # Save final dataset in parquet (sink streaming) and csv
+    output_path = sink_parquet(lf)
+    write_source_hashes(source, output_path)
+
+    # Agrégats par hexagone (histogramme des catégories + min / max) pour le run suivant
+    if aggregates is None:
+        aggregates = CellAggregates.from_frame(pl.scan_parquet(output_path), level="commune")
+    aggregates.save(output_path)
+
+    print(f"Total rows: {pl.scan_parquet(output_path).select(pl.len()).collect().item()}")
+    save_tables_csv(pl.scan_parquet(output_path))
+
+    # Dataset partitionné par région (merged_*/ + index des communes) pour POIFilter
+    write_parquet_dataset(pl.scan_parquet(output_path), Path(output_path).with_suffix(""))
 
     end_total = time.perf_counter()
     print(f"\n=== Temps total du process : {end_total - start_total:.2f} sec ===")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python main.py --full : retraite toutes les lignes
+    # python main.py --jobs 8 : indexation H3 sur 8 processus
+    args = sys.argv[1:]
+    n_jobs = int(args[args.index("--jobs") + 1]) if "--jobs" in args else 1
+    main(full="--full" in args, n_jobs=n_jobs)
\ No newline at end of file
@@ -7,6 +7,7 @@ import numpy as np
 import asyncio
 
 from src.features.osrm import OSRMClientAsync
+from src.features.osrm_matrix import BlockDiagonalMatrix, OSRMMatrix
 
 
 @dataclass
@@ -16,9 +17,10 @@ class ItineraryOptimizer:
     - travaille par 'day'
     - utilise osrm_index pour mapper les lignes/colonnes de la matrice aux POIs
     - heuristique : nearest neighbor + 2-opt
+    - dist_matrix peut être dense (NxN) ou par blocs (une sous-matrice par cluster)
     """
     df_pois: pl.DataFrame                     # df_clustered
-    dist_matrix: np.ndarray                   # matrice distances/durations NxN
+    dist_matrix: np.ndarray | BlockDiagonalMatrix  # matrice distances/durations NxN
     metric: Literal["distance", "duration"] = "duration"
 
     @classmethod
@@ -34,12 +36,29 @@ class ItineraryOptimizer:
             metric=metric,
         )
 
+    @classmethod
+    def from_osrm_matrix(
+        cls,
+        df_pois: pl.DataFrame,
+        osrm_matrix: OSRMMatrix,
+        metric: Literal["distance", "duration"] = "duration",
+    ) -> "ItineraryOptimizer":
+        """Utilise directement les tableaux numpy de l'OSRMMatrix (sans copie)."""
+        return cls(
+            df_pois=df_pois,
+            dist_matrix=osrm_matrix.get(metric),
+            metric=metric,
+        )
+
     # ---------- Heuristique TSP : nearest neighbor ----------
 
     def _nearest_neighbor(self, indices: List[int], start_index: Optional[int] = None) -> List[int]:
         """
         Construit un tour initial avec nearest neighbor.
         'indices' sont des osrm_index (subset pour un jour donné).
+        Les coûts NaN (bloc OSRM en échec hors mode dégradé, paire non routable)
+        sont ignorés ; si aucun voisin n'a de coût connu, le tour continue avec
+        le prochain POI restant dans l'ordre de 'indices'.
         """
         if not indices:
             return []
@@ -64,6 +83,8 @@ class ItineraryOptimizer:
                 if cost < best_cost:
                     best_cost = cost
                     best_next = j
+            if best_next is None:
+                best_next = next(j for j in indices if j in remaining)
             tour.append(best_next)
             remaining.remove(best_next)
             current = best_next
@@ -236,23 +257,11 @@ class ItineraryOptimizer:
         coords = df_day.select(["latitude", "longitude"]).to_numpy().tolist()
         coords = [tuple(row) for row in coords]
 
-        tasks = []
-        for i in range(len(coords) - 1):
-            start = coords[i]
-            end = coords[i + 1]
-            tasks.append(osrm.route_geojson(start, end))
-
-        segments = await asyncio.gather(*tasks)
-
-        full_coords = []
-        for i, seg in enumerate(segments):
-            if i == 0:
-                full_coords.extend(seg["coordinates"])
-            else:
-                full_coords.extend(seg["coordinates"][1:])
+        # une seule requête OSRM pour tous les waypoints du jour
+        route = await osrm.route_geojson_multi(coords)
 
         return {
             "type": "LineString",
-            "coordinates": full_coords
+            "coordinates": route["geometry"]["coordinates"],
+            "legs": route["legs"],
         }
-
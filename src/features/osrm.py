@@ -1,23 +1,156 @@
 import aiohttp
 import asyncio
-import math
+import random
+import time
 import numpy as np
-from typing import List, Tuple, Literal
+from typing import List, Tuple, Literal, Optional
+
+from src.features.osrm_cache import OSRMMatrixCache, split_missing_pairs
+from src.features.osrm_matrix import OSRMMatrix
+from src.features.osrm_json import loads, decode_table_into
+from src.features.osrm_limiter import AIMDLimiter
+from src.features.osrm_fallback import PROFILE_TO_MODE, HaversineClient
+
+# Profils pour lesquels durée(a -> b) ≈ durée(b -> a)
+SYMMETRIC_PROFILES = ("foot", "walking", "walk")
+
+# Statuts HTTP pour lesquels la requête est rejouée (surcharge / indisponibilité)
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class OSRMError(Exception):
+    """Réponse OSRM valide dont le champ `code` n'est pas "Ok" (NoSegment, NoTable...)."""
+
+
+# Erreurs qui font d'un bloc un "failed block" (NaN ou estimation en mode dégradé) ;
+# toute autre exception (bug, réponse mal formée) est propagée
+BLOCK_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSRMError)
 
 
 class OSRMClientAsync:
+    """
+    Client OSRM asynchrone.
+    Une seule session aiohttp (connecteur keep-alive borné) est partagée
+    entre table() et route_geojson() ; elle est créée à la demande et
+    libérée par close() ou en sortie de `async with`.
+
+    Le choix du backend (local / public) est mis en cache pendant
+    `backend_ttl` secondes : seule la première détection est bloquante,
+    les suivantes sont relancées en tâche de fond.
+
+    Si un `cache` (OSRMMatrixCache) est fourni, table() ne demande à OSRM
+    que les paires absentes du cache, puis les y enregistre.
+
+    Les matrices sont découpées en chunks dont la taille est bornée par
+    max_chunk_size (limite serveur) et par max_url_length. Pour un profil
+    symétrique (marche), seuls les blocs i <= j sont demandés puis transposés.
+
+    La concurrence est régulée par un limiteur AIMD partagé (entre 1 et
+    max_concurrency requêtes) ; les erreurs transitoires (429/5xx, timeouts)
+    sont rejouées avec un backoff exponentiel à jitter. Les chunks en échec
+    définitif sont listés dans OSRMMatrix.failed_blocks.
+
+    Mode dégradé (degraded_mode=True) : si OSRM est injoignable, les chunks
+    en échec (ou la matrice entière) et les routes sont estimés par
+    HaversineClient ; le résultat est alors marqué `degraded`. Un profil sans
+    vitesse connue (profil OSRM personnalisé) n'a pas de mode dégradé.
+    """
+
     def __init__(
         self,
         local_url="http://localhost:5000",
         public_url="https://router.project-osrm.org",
         max_chunk_size: int = 80,
-        max_concurrency: int = 20,   # nombre de requêtes simultanées
+        max_concurrency: int = 20,   # nombre max de requêtes simultanées
+        initial_concurrency: int = 8,  # point de départ du limiteur AIMD
+        max_route_waypoints: int = 100,  # au-delà, route_geojson_multi découpe
+        keepalive_timeout: float = 30.0,
+        backend_ttl: float = 300.0,     # durée de validité de la détection (s)
+        probe_timeout: float = 1.0,
+        profile: str = "driving",
+        cache: Optional[OSRMMatrixCache] = None,
+        max_url_length: int = 8000,
+        symmetric: Optional[bool] = None,  # None : déduit du profil
+        max_retries: int = 4,
+        backoff_base: float = 0.25,    # secondes
+        backoff_max: float = 8.0,
+        degraded_mode: bool = True,
     ):
         self.local_url = local_url.rstrip("/")
         self.public_url = public_url.rstrip("/")
         self.base_url = self.public_url  # détection async plus bas
         self.max_chunk_size = max_chunk_size
         self.max_concurrency = max_concurrency
+        self.max_route_waypoints = max_route_waypoints
+        self.keepalive_timeout = keepalive_timeout
+        self.backend_ttl = backend_ttl
+        self.probe_timeout = probe_timeout
+        self.profile = profile
+        self.cache = cache
+        self.max_url_length = max_url_length
+        self.symmetric = symmetric
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.degraded_mode = degraded_mode
+        self._fallback: Optional[HaversineClient] = None
+
+        self._limiter = AIMDLimiter(
+            initial_limit=initial_concurrency,
+            max_limit=max_concurrency,
+        )
+
+        # état de santé du backend
+        self._backend_checked_at: Optional[float] = None
+        self._probe_task: Optional[asyncio.Task] = None
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def fallback(self) -> Optional[HaversineClient]:
+        """Estimateur du mode dégradé, créé à la première utilisation."""
+        if not self.degraded_mode or self.profile not in PROFILE_TO_MODE:
+            return None
+        if self._fallback is None:
+            self._fallback = HaversineClient(profile=self.profile)
+        return self._fallback
+
+    # ----------------------------------------------------------------------
+    # Session HTTP partagée
+    # ----------------------------------------------------------------------
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Retourne la session partagée, en la (re)créant si elle est fermée
+        ou si elle appartient à une autre boucle (appels successifs à asyncio.run).
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+            self._limiter.reset()
+        return self._session
+
+    async def close(self):
+        """Ferme la session partagée (à appeler avant la fin de la boucle)."""
+        if self._probe_task is not None and not self._probe_task.done():
+            self._probe_task.cancel()
+        self._probe_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def __aenter__(self) -> "OSRMClientAsync":
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     # async def detect_backend(self):
     #     """Détecte si l’OSRM local est disponible."""
@@ -31,73 +164,205 @@ class OSRMClientAsync:
     #         pass
     #     self.base_url = self.public_url
 
-    async def detect_backend(self):
+    # ----------------------------------------------------------------------
+    # Détection du backend (avec cache TTL)
+    # ----------------------------------------------------------------------
+    async def _probe_local(self) -> bool:
         try:
-            test_url = f"{self.local_url}/route/v1/driving/2.35,48.85;2.36,48.86"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(test_url, timeout=1) as r:
-                    if r.status == 200:
-                        self.base_url = self.local_url
-                        return
-        except:
-            pass
-
+            test_url = f"{self.local_url}/route/v1/{self.profile}/2.35,48.85;2.36,48.86"
+            session = await self._get_session()
+            timeout = aiohttp.ClientTimeout(total=self.probe_timeout)
+            async with session.get(test_url, timeout=timeout) as r:
+                return r.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def detect_backend(self, force: bool = False):
+        """
+        Choisit le backend OSRM (local si disponible, sinon public).
+        Le résultat est réutilisé tant qu'il a moins de `backend_ttl` secondes,
+        sauf si force=True.
+        """
+        if not force and not self._backend_expired():
+            return
+
+        is_local_up = await self._probe_local()
+        self.base_url = self.local_url if is_local_up else self.public_url
+        self._backend_checked_at = time.monotonic()
+
+    def _backend_expired(self) -> bool:
+        if self._backend_checked_at is None:
+            return True
+        return time.monotonic() - self._backend_checked_at > self.backend_ttl
+
+    def _schedule_probe(self):
+        """Relance la détection en tâche de fond (une seule à la fois)."""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self.detect_backend(force=True))
+
+    async def _ensure_backend(self):
+        """
+        Première détection bloquante ; ensuite, une détection expirée
+        est rafraîchie en arrière-plan sans retarder l'appel courant.
+        Les appels concurrents arrivés avant la fin de la première détection
+        attendent la même sonde au lieu d'en lancer chacun une.
+        """
+        if self._backend_checked_at is None:
+            task = self._probe_task
+            if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+                task = asyncio.create_task(self.detect_backend())
+                self._probe_task = task
+            await asyncio.shield(task)
+        elif self._backend_expired():
+            self._schedule_probe()
+
+    def _on_local_failure(self):
+        """L'OSRM local ne répond plus : bascule sur le public et re-sonde en fond."""
         self.base_url = self.public_url
+        self._backend_checked_at = time.monotonic()
+        self._schedule_probe()
+
+    async def _request(self, base_url: str, path: str, params: dict) -> bytes:
+        """Une requête GET, sous le limiteur AIMD qui est informé du résultat."""
+        session = await self._get_session()
+        async with self._limiter:
+            start = time.monotonic()
+            try:
+                async with session.get(f"{base_url}{path}", params=params) as r:
+                    r.raise_for_status()
+                    body = await r.read()
+            except aiohttp.ClientResponseError as e:
+                if e.status in RETRYABLE_STATUS:
+                    self._limiter.on_error(start)
+                raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self._limiter.on_error(start)
+                raise
+            self._limiter.on_success(time.monotonic() - start)
+            return body
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Backoff exponentiel avec jitter complet ; Retry-After est respecté s'il est fourni."""
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _get_raw(self, path: str, params: dict) -> bytes:
+        """
+        GET sur le backend courant, corps brut.
+        - 429/5xx, timeouts : rejoués jusqu'à max_retries fois avec backoff
+        - OSRM local injoignable : bascule immédiate sur le serveur public
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            base_url = self.base_url
+            retry_after = None
+            try:
+                return await self._request(base_url, path, params)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRYABLE_STATUS:
+                    raise
+                last_error = e
+                retry_after = e.headers.get("Retry-After") if e.headers else None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                last_error = e
+                if base_url == self.local_url:
+                    # l'OSRM local ne répond plus : on rejoue sur le public sans attendre
+                    self._on_local_failure()
+                    continue
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+        raise last_error
+
+    async def _get_json(self, path: str, params: dict):
+        return loads(await self._get_raw(path, params))
 
     @staticmethod
     def _coords_to_str(coords: List[Tuple[float, float]]) -> str:
-        return ";".join([f"{longitude},{latitude}" for latitude, longitude in coords])
+        # 6 décimales ≈ 10 cm : suffisant pour OSRM et raccourcit l'URL
+        return ";".join([f"{longitude:.6f},{latitude:.6f}" for latitude, longitude in coords])
+
+    def _is_symmetric(self) -> bool:
+        if self.symmetric is not None:
+            return self.symmetric
+        return self.profile in SYMMETRIC_PROFILES
+
+    def _plan_chunks(self, coords) -> List[Tuple[int, int]]:
+        """
+        Découpe coords en intervalles [start, end) contigus.
+        Chaque chunk respecte max_chunk_size et occupe au plus la moitié
+        de max_url_length, pour qu'une paire de chunks tienne dans une URL.
+        """
+        overhead = len(self.base_url) + len(self.profile) + 128  # chemin + paramètres
+        budget = max((self.max_url_length - overhead) // 2, 1)
+
+        chunks = []
+        start = 0
+        size = 0
+        for k, (latitude, longitude) in enumerate(coords):
+            # "lon,lat;" + index dans sources/destinations "nnn;" (";" encodé en %3B)
+            cost = len(f"{longitude:.6f},{latitude:.6f}") + 1 + len(str(k - start)) + 3
+            if k > start and (k - start >= self.max_chunk_size or size + cost > budget):
+                chunks.append((start, k))
+                start = k
+                size = len(f"{longitude:.6f},{latitude:.6f}") + 5
+            else:
+                size += cost
+        chunks.append((start, len(coords)))
+        return chunks
 
     # ----------------------------------------------------------------------
     # Appel OSRM simple
     # ----------------------------------------------------------------------
-    async def _table_raw(self, coords, annotations="duration,distance"):
+    async def _table_raw(self, coords, annotations="duration,distance") -> bytes:
         coord_str = self._coords_to_str(coords)
-        url = f"{self.base_url}/table/v1/driving/{coord_str}"
         params = {"annotations": annotations}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as r:
-                r.raise_for_status()
-                return await r.json()
+        return await self._get_raw(f"/table/v1/{self.profile}/{coord_str}", params)
 
     # ----------------------------------------------------------------------
-    # Appel OSRM chunké + asynchrone
+    # Bloc source x destination chunké + asynchrone
     # ----------------------------------------------------------------------
-    async def table(self, coords, annotations="duration,distance"):
-        await self.detect_backend()
-
-        n = len(coords)
-        if n == 0:
-            raise ValueError("coords est vide")
-
-        # Cas simple : pas besoin de chunk
-        if n <= self.max_chunk_size:
-            return await self._table_raw(coords, annotations)
-
-        chunk_size = self.max_chunk_size
-        num_chunks = math.ceil(n / chunk_size)
-
-        durations = np.zeros((n, n), dtype=float)
-        distances = np.zeros((n, n), dtype=float)
-
-        semaphore = asyncio.Semaphore(self.max_concurrency)
+    async def _table_block(self, src_coords, dst_coords, annotations="duration,distance"):
+        """
+        Calcule le bloc len(src) x len(dst) en découpant sources et destinations
+        en chunks (cf. _plan_chunks). Retourne (durations, distances, failed_blocks) :
+        matrices numpy et liste des blocs {"sources", "destinations", "error"}
+        restés à NaN après épuisement des tentatives.
+        - blocs diagonaux d'une matrice carrée : coordonnées envoyées une seule fois
+        - profil symétrique : seuls les blocs i <= j sont demandés, puis transposés
+        """
+        n_src = len(src_coords)
+        n_dst = len(dst_coords)
+
+        durations = np.full((n_src, n_dst), np.nan, dtype=np.float32)
+        distances = np.full((n_src, n_dst), np.nan, dtype=np.float32)
+
+        square = src_coords is dst_coords
+        src_chunks = self._plan_chunks(src_coords)
+        dst_chunks = src_chunks if square else self._plan_chunks(dst_coords)
+        mirror = square and self._is_symmetric()
 
         async def process_chunk(i, j):
-            async with semaphore:
-                start_i = i * chunk_size
-                end_i = min((i + 1) * chunk_size, n)
-
-                start_j = j * chunk_size
-                end_j = min((j + 1) * chunk_size, n)
+            start_i, end_i = src_chunks[i]
+            start_j, end_j = dst_chunks[j]
 
-                sub_coords_src = coords[start_i:end_i]
-                sub_coords_dst = coords[start_j:end_j]
+            # la concurrence est régulée par le limiteur AIMD dans _request
+            if square and i == j:
+                raw = await self._table_raw(src_coords[start_i:end_i], annotations)
+            else:
+                sub_coords_src = src_coords[start_i:end_i]
+                sub_coords_dst = dst_coords[start_j:end_j]
 
                 coord_str_src = self._coords_to_str(sub_coords_src)
                 coord_str_dst = self._coords_to_str(sub_coords_dst)
 
-                url = f"{self.base_url}/table/v1/driving/{coord_str_src};{coord_str_dst}"
+                path = f"/table/v1/{self.profile}/{coord_str_src};{coord_str_dst}"
 
                 params = {
                     "sources": ";".join(map(str, range(len(sub_coords_src)))),
@@ -107,56 +372,259 @@ class OSRMClientAsync:
                     "annotations": annotations,
                 }
 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params) as r:
-                        r.raise_for_status()
-                        data = await r.json()
-
-                return (i, j, data)
-
-        # Lancer toutes les tâches en parallèle
-        tasks = [
-            process_chunk(i, j)
-            for i in range(num_chunks)
-            for j in range(num_chunks)
+                raw = await self._get_raw(path, params)
+
+            # décodage direct dans les buffers de la matrice finale
+            data = decode_table_into(
+                raw,
+                durations[start_i:end_i, start_j:end_j],
+                distances[start_i:end_i, start_j:end_j],
+            )
+            if data.get("code", "Ok") != "Ok":
+                raise OSRMError(f"{data['code']}: {data.get('message', '')}")
+
+            if mirror and i != j:
+                durations[start_j:end_j, start_i:end_i] = durations[start_i:end_i, start_j:end_j].T
+                distances[start_j:end_j, start_i:end_i] = distances[start_i:end_i, start_j:end_j].T
+
+        # Lancer toutes les tâches en parallèle ; un chunk en échec n'arrête pas les autres
+        pairs = [
+            (i, j)
+            for i in range(len(src_chunks))
+            for j in range(len(dst_chunks))
+            if not (mirror and j < i)
         ]
+        results = await asyncio.gather(
+            *(process_chunk(i, j) for i, j in pairs),
+            return_exceptions=True,
+        )
+
+        failed_blocks = []
+        for (i, j), result in zip(pairs, results):
+            if not isinstance(result, Exception):
+                continue
+            if not isinstance(result, BLOCK_ERRORS):
+                raise result
+            rows = np.arange(*src_chunks[i])
+            cols = np.arange(*dst_chunks[j])
+            failed_blocks.append({"sources": rows, "destinations": cols, "error": repr(result)})
+            if mirror and i != j:
+                failed_blocks.append({"sources": cols, "destinations": rows, "error": repr(result)})
+
+        # rien n'a pu être calculé : inutile de renvoyer une matrice vide
+        if len(failed_blocks) and all(isinstance(r, Exception) for r in results):
+            raise results[0]
+
+        return durations, distances, failed_blocks
 
-        for coro in asyncio.as_completed(tasks):
-            i, j, data = await coro
-
-            start_i = i * chunk_size
-            end_i = min((i + 1) * chunk_size, n)
-
-            start_j = j * chunk_size
-            end_j = min((j + 1) * chunk_size, n)
+    # ----------------------------------------------------------------------
+    # Matrice avec cache persistant
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _fetched_mask(shape, failed_blocks) -> np.ndarray:
+        """Masque des paires effectivement obtenues (hors blocs en échec)."""
+        mask = np.ones(shape, dtype=bool)
+        for block in failed_blocks:
+            mask[np.ix_(block["sources"], block["destinations"])] = False
+        return mask
+
+    async def _table_cached(self, coords):
+        """
+        Lit la matrice dans le cache et ne demande à OSRM que les paires manquantes,
+        regroupées en deux blocs (nouveaux points x tous, autres points x nouveaux).
+        Un bloc en échec est signalé dans failed_blocks sans invalider l'autre ;
+        les paires en échec ne sont pas écrites dans le cache.
+        """
+        # le cache stocke toujours durée et distance
+        annotations = "duration,distance"
+
+        durations, distances, known = await asyncio.to_thread(
+            self.cache.get_block, coords, coords, self.profile
+        )
+        if known.all():
+            return durations, distances, []
+
+        if not known.any():
+            durations, distances, failed_blocks = await self._table_block(coords, coords, annotations)
+            mask = self._fetched_mask(durations.shape, failed_blocks)
+            await asyncio.to_thread(
+                self.cache.put_block, coords, coords, self.profile, durations, distances, mask
+            )
+            return durations, distances, failed_blocks
+
+        new_idx, known_idx = split_missing_pairs(~known)
+        all_idx = np.arange(len(coords))
+
+        blocks = [(new_idx, all_idx)]
+        # profil symétrique : le bloc autres x nouveaux est la transposée du premier
+        if len(known_idx) > 0 and not self._is_symmetric():
+            blocks.append((known_idx, new_idx))
+
+        block_coords = [
+            ([coords[i] for i in rows], [coords[j] for j in cols])
+            for rows, cols in blocks
+        ]
+        # un bloc entièrement en échec ne fait pas perdre les paires du cache ni l'autre bloc
+        results = await asyncio.gather(
+            *(self._table_block(src, dst, annotations) for src, dst in block_coords),
+            return_exceptions=True,
+        )
+
+        failed_blocks = []
+        for (rows, cols), (src, dst), result in zip(blocks, block_coords, results):
+            if isinstance(result, Exception):
+                if not isinstance(result, BLOCK_ERRORS):
+                    raise result
+                failed_blocks.append({"sources": rows, "destinations": cols, "error": repr(result)})
+                continue
+            dur, dist, failed = result
+            durations[np.ix_(rows, cols)] = dur
+            distances[np.ix_(rows, cols)] = dist
+            mask = self._fetched_mask(dur.shape, failed)
+            await asyncio.to_thread(self.cache.put_block, src, dst, self.profile, dur, dist, mask)
+            failed_blocks.extend(
+                {
+                    "sources": rows[block["sources"]],
+                    "destinations": cols[block["destinations"]],
+                    "error": block["error"],
+                }
+                for block in failed
+            )
+
+        if len(known_idx) > 0 and self._is_symmetric():
+            dur = durations[np.ix_(new_idx, known_idx)].T
+            dist = distances[np.ix_(new_idx, known_idx)].T
+            durations[np.ix_(known_idx, new_idx)] = dur
+            distances[np.ix_(known_idx, new_idx)] = dist
+            src = [coords[i] for i in known_idx]
+            dst = [coords[j] for j in new_idx]
+            mask = self._fetched_mask(durations.shape, failed_blocks)[np.ix_(new_idx, known_idx)].T
+            await asyncio.to_thread(self.cache.put_block, src, dst, self.profile, dur, dist, mask)
+            failed_blocks.extend(
+                {
+                    "sources": block["destinations"],
+                    "destinations": block["sources"],
+                    "error": block["error"],
+                }
+                for block in list(failed_blocks)
+            )
 
-            if "durations" in data:
-                durations[start_i:end_i, start_j:end_j] = data["durations"]
+        return durations, distances, failed_blocks
 
-            if "distances" in data:
-                distances[start_i:end_i, start_j:end_j] = data["distances"]
+    # ----------------------------------------------------------------------
+    # Matrice complète
+    # ----------------------------------------------------------------------
+    async def table(self, coords, annotations="duration,distance") -> OSRMMatrix:
+        """
+        Matrices durée/distance NxN pour coords (latitude, longitude).
+        Retourne un OSRMMatrix (numpy float32, index 0..N-1) ; une annotation
+        non demandée reste à NaN. Un chunk en échec reste à NaN, ou est estimé
+        en mode dégradé (cf. failed_blocks, degraded).
+        """
+        await self._ensure_backend()
 
-        result = {}
-        if "duration" in annotations:
-            result["durations"] = durations.tolist()
-        if "distance" in annotations:
-            result["distances"] = distances.tolist()
+        n = len(coords)
+        if n == 0:
+            raise ValueError("coords est vide")
 
-        return result
+        try:
+            if self.cache is not None:
+                durations, distances, failed_blocks = await self._table_cached(coords)
+            else:
+                durations, distances, failed_blocks = await self._table_block(coords, coords, annotations)
+        except BLOCK_ERRORS:
+            if self.fallback is None:
+                raise
+            # ni l'OSRM local ni le public ne répondent : matrice estimée
+            return await self.fallback.table(coords, annotations)
+
+        degraded = False
+        if failed_blocks and self.fallback is not None:
+            # blocs en échec complétés par l'estimation haversine
+            for block in failed_blocks:
+                rows, cols = block["sources"], block["destinations"]
+                est_dur, est_dist = self.fallback.matrix(
+                    [coords[i] for i in rows], [coords[j] for j in cols]
+                )
+                durations[np.ix_(rows, cols)] = est_dur
+                distances[np.ix_(rows, cols)] = est_dist
+            degraded = True
+
+        return OSRMMatrix(
+            durations=durations.astype(np.float32, copy=False),
+            distances=distances.astype(np.float32, copy=False),
+            index=np.arange(n, dtype=np.int64),
+            profile=self.profile,
+            failed_blocks=failed_blocks,
+            degraded=degraded,
+        )
 
     # ----------------------------------------------------------------------
     # Route GeoJSON (async)
     # ----------------------------------------------------------------------
     async def route_geojson(self, start, end):
-        await self.detect_backend()
+        route = await self.route_geojson_multi([start, end])
+        return route["geometry"]
 
-        coord_str = self._coords_to_str([start, end])
-        url = f"{self.base_url}/route/v1/driving/{coord_str}"
+    async def _route_raw(self, coords):
+        coord_str = self._coords_to_str(coords)
         params = {"overview": "full", "geometries": "geojson"}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as r:
-                r.raise_for_status()
-                data = await r.json()
+        data = await self._get_json(f"/route/v1/{self.profile}/{coord_str}", params)
+
+        return data["routes"][0]
+
+    async def route_geojson_multi(self, coords):
+        """
+        Route OSRM passant par tous les waypoints `coords` (latitude, longitude)
+        en un minimum de requêtes.
+        Au-delà de `max_route_waypoints`, les waypoints sont découpés en tronçons
+        qui se chevauchent d'un point, puis recollés.
+
+        Retourne un dict :
+            - geometry : LineString GeoJSON complète
+            - legs     : [{"duration", "distance"}] pour chaque paire consécutive
+            - duration, distance : totaux
+            - degraded : True si la route est une estimation en lignes droites
+        """
+        if len(coords) < 2:
+            return {
+                "geometry": {"type": "LineString", "coordinates": []},
+                "legs": [],
+                "duration": 0.0,
+                "distance": 0.0,
+                "degraded": False,
+            }
+
+        await self._ensure_backend()
+
+        step = max(self.max_route_waypoints, 2) - 1
+        chunks = [
+            coords[start:start + step + 1]
+            for start in range(0, len(coords) - 1, step)
+        ]
 
-        return data["routes"][0]["geometry"]
\ No newline at end of file
+        try:
+            routes = await asyncio.gather(*(self._route_raw(chunk) for chunk in chunks))
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if self.fallback is None:
+                raise
+            return await self.fallback.route_geojson_multi(coords)
+
+        full_coords = []
+        legs = []
+        for i, route in enumerate(routes):
+            seg_coords = route["geometry"]["coordinates"]
+            full_coords.extend(seg_coords if i == 0 else seg_coords[1:])
+            legs.extend(
+                {"duration": leg["duration"], "distance": leg["distance"]}
+                for leg in route["legs"]
+            )
+
+        return {
+            "geometry": {"type": "LineString", "coordinates": full_coords},
+            "legs": legs,
+            "duration": sum(leg["duration"] for leg in legs),
+            "distance": sum(leg["distance"] for leg in legs),
+            "degraded": False,
+        }
\ No newline at end of file
@@ -0,0 +1,212 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+# Précision des clés : 1e-5 degré ≈ 1 m
+COORD_SCALE = 100_000
+LON_SPAN = 360 * COORD_SCALE + 1
+
+
+def coord_key(latitude: float, longitude: float) -> int:
+    """Encode un couple (latitude, longitude) arrondi au mètre en un entier 64 bits."""
+    lat_i = int(round((latitude + 90.0) * COORD_SCALE))
+    lon_i = int(round((longitude + 180.0) * COORD_SCALE))
+    return lat_i * LON_SPAN + lon_i
+
+
+def split_missing_pairs(missing: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Découpe les paires manquantes d'une matrice carrée en deux blocs à demander à OSRM.
+    On choisit (glouton) un ensemble U de points couvrant toutes les cases manquantes :
+    les blocs U x tous et K x U (K = les autres points) suffisent alors.
+    Retourne (U, K) sous forme d'indices.
+    """
+    missing = missing.copy()
+    counts = missing.sum(axis=0) + missing.sum(axis=1)
+    new_idx = []
+
+    while counts.max(initial=0) > 0:
+        i = int(np.argmax(counts))
+        new_idx.append(i)
+        counts -= missing[i, :].astype(np.int64) + missing[:, i]
+        missing[i, :] = False
+        missing[:, i] = False
+        counts[i] = 0
+
+    new_idx = np.array(sorted(new_idx), dtype=np.int64)
+    known_idx = np.setdiff1d(np.arange(missing.shape[0]), new_idx)
+    return new_idx, known_idx
+
+
+class OSRMMatrixCache:
+    """
+    Cache persistant (SQLite) des durées/distances OSRM par paire de coordonnées.
+    Clé : (profile, source, destination), coordonnées arrondies au mètre.
+    L'éviction est de type LRU dès que le nombre de paires dépasse max_entries.
+    Le nombre de paires est suivi par un majorant (lignes écrites depuis le dernier
+    comptage) : le COUNT(*) complet n'est relancé que lorsqu'il dépasse max_entries.
+    """
+
+    def __init__(self, path: Path | str, max_entries: int = 5_000_000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._n_entries_bound: Optional[int] = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pairs (
+                    profile TEXT NOT NULL,
+                    src INTEGER NOT NULL,
+                    dst INTEGER NOT NULL,
+                    duration REAL,
+                    distance REAL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (profile, src, dst)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pairs_last_used ON pairs(last_used)")
+
+    @contextmanager
+    def _connect(self):
+        # une connexion par appel : utilisable depuis asyncio.to_thread
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _load_keys(conn: sqlite3.Connection, table: str, keys: List[int]):
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} (pos INTEGER, k INTEGER)")
+        conn.execute(f"DELETE FROM {table}")
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?)", enumerate(keys))
+
+    # -----------------------------
+    # LECTURE
+    # -----------------------------
+
+    def get_block(
+        self,
+        src_coords: List[Tuple[float, float]],
+        dst_coords: List[Tuple[float, float]],
+        profile: str,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Retourne (durations, distances, known) de forme (len(src), len(dst)).
+        `known` indique les paires présentes dans le cache.
+        """
+        n_src, n_dst = len(src_coords), len(dst_coords)
+        durations = np.full((n_src, n_dst), np.nan)
+        distances = np.full((n_src, n_dst), np.nan)
+        known = np.zeros((n_src, n_dst), dtype=bool)
+
+        with self._connect() as conn:
+            self._load_keys(conn, "q_src", [coord_key(*c) for c in src_coords])
+            self._load_keys(conn, "q_dst", [coord_key(*c) for c in dst_coords])
+
+            rows = conn.execute(
+                """
+                SELECT s.pos, d.pos, p.duration, p.distance
+                FROM q_src s
+                JOIN pairs p ON p.profile = ? AND p.src = s.k
+                JOIN q_dst d ON p.dst = d.k
+                """,
+                (profile,),
+            ).fetchall()
+
+            if rows:
+                conn.execute(
+                    """
+                    UPDATE pairs SET last_used = ?
+                    WHERE profile = ?
+                      AND src IN (SELECT k FROM q_src)
+                      AND dst IN (SELECT k FROM q_dst)
+                    """,
+                    (time.time(), profile),
+                )
+
+        if rows:
+            data = np.array(rows, dtype=float)
+            i = data[:, 0].astype(np.int64)
+            j = data[:, 1].astype(np.int64)
+            durations[i, j] = data[:, 2]
+            distances[i, j] = data[:, 3]
+            known[i, j] = True
+
+        return durations, distances, known
+
+    # -----------------------------
+    # ÉCRITURE
+    # -----------------------------
+
+    def put_block(
+        self,
+        src_coords: List[Tuple[float, float]],
+        dst_coords: List[Tuple[float, float]],
+        profile: str,
+        durations: np.ndarray,
+        distances: np.ndarray,
+        mask: Optional[np.ndarray] = None,
+    ):
+        """
+        Enregistre un bloc source x destination calculé par OSRM.
+        mask : paires à écrire (les paires en échec ne doivent pas être mises en cache).
+        """
+        src_keys = [coord_key(*c) for c in src_coords]
+        dst_keys = [coord_key(*c) for c in dst_coords]
+        now = time.time()
+
+        def _rows():
+            for i, src in enumerate(src_keys):
+                for j, dst in enumerate(dst_keys):
+                    if mask is not None and not mask[i, j]:
+                        continue
+                    dur = durations[i, j]
+                    dist = distances[i, j]
+                    yield (
+                        profile,
+                        src,
+                        dst,
+                        None if np.isnan(dur) else float(dur),
+                        None if np.isnan(dist) else float(dist),
+                        now,
+                    )
+
+        with self._connect() as conn:
+            cursor = conn.executemany("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?, ?, ?)", _rows())
+            n_written = max(cursor.rowcount, 0)
+
+        # un remplacement compte comme une écriture : majorant du nombre de paires
+        if self._n_entries_bound is not None:
+            self._n_entries_bound += n_written
+        if self._n_entries_bound is None or self._n_entries_bound > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """Supprime les paires les moins récemment utilisées au-delà de max_entries."""
+        with self._connect() as conn:
+            n_entries = conn.execute("SELECT COUNT(*) FROM pairs").fetchone()[0]
+            if n_entries <= self.max_entries:
+                self._n_entries_bound = n_entries
+                return
+            # marge de 10 % pour ne pas évincer à chaque écriture
+            n_to_delete = n_entries - int(self.max_entries * 0.9)
+            conn.execute(
+                """
+                DELETE FROM pairs WHERE (profile, src, dst) IN (
+                    SELECT profile, src, dst FROM pairs ORDER BY last_used LIMIT ?
+                )
+                """,
+                (n_to_delete,),
+            )
+            self._n_entries_bound = n_entries - n_to_delete
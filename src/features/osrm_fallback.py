@@ -0,0 +1,116 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.data.etl.utils.geo import haversine_np, haversine_matrix_km
+from src.features.osrm_matrix import OSRMMatrix
+
+# Profils OSRM -> mode de transport
+PROFILE_TO_MODE = {
+    "foot": "walk",
+    "walking": "walk",
+    "walk": "walk",
+    "bike": "bike",
+    "bicycle": "bike",
+    "cycling": "bike",
+    "car": "car",
+    "driving": "car",
+}
+
+# Vitesse moyenne (km/h) et facteur de détour (réseau / vol d'oiseau) par mode
+MODE_SPEED_KMH = {"walk": 4.5, "bike": 15.0, "car": 30.0}
+MODE_DETOUR_FACTOR = {"walk": 1.3, "bike": 1.3, "car": 1.4}
+
+
+class HaversineClient:
+    """
+    Remplaçant d'OSRMClientAsync sans serveur : durées et distances estimées
+    à partir de la distance grand cercle, d'un facteur de détour et d'une
+    vitesse moyenne par mode (marche / vélo / voiture).
+    Même interface publique (table, route_geojson, route_geojson_multi, async with) :
+    utilisable comme mode dégradé, en test ou en benchmark.
+    """
+
+    def __init__(
+        self,
+        profile: str = "driving",
+        speed_kmh: Optional[float] = None,
+        detour_factor: Optional[float] = None,
+    ):
+        mode = PROFILE_TO_MODE.get(profile)
+        if mode is None:
+            raise ValueError(f"Profil inconnu : {profile}")
+
+        self.profile = profile
+        self.speed_kmh = speed_kmh or MODE_SPEED_KMH[mode]
+        self.detour_factor = detour_factor or MODE_DETOUR_FACTOR[mode]
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self) -> "HaversineClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # -----------------------------
+    # MATRICES
+    # -----------------------------
+
+    def matrix(self, src_coords, dst_coords) -> Tuple[np.ndarray, np.ndarray]:
+        """(durations en s, distances en m) float32 de forme len(src) x len(dst)."""
+        distances = haversine_matrix_km(src_coords, dst_coords) * (1000.0 * self.detour_factor)
+        durations = distances / (self.speed_kmh / 3.6)
+        return durations.astype(np.float32), distances.astype(np.float32)
+
+    async def table(self, coords, annotations="duration,distance") -> OSRMMatrix:
+        if len(coords) == 0:
+            raise ValueError("coords est vide")
+
+        durations, distances = self.matrix(coords, coords)
+        return OSRMMatrix(
+            durations=durations,
+            distances=distances,
+            index=np.arange(len(coords), dtype=np.int64),
+            profile=self.profile,
+            degraded=True,
+        )
+
+    # -----------------------------
+    # ROUTES (lignes droites)
+    # -----------------------------
+
+    async def route_geojson(self, start, end):
+        route = await self.route_geojson_multi([start, end])
+        return route["geometry"]
+
+    async def route_geojson_multi(self, coords: List[Tuple[float, float]]):
+        if len(coords) < 2:
+            return {
+                "geometry": {"type": "LineString", "coordinates": []},
+                "legs": [],
+                "duration": 0.0,
+                "distance": 0.0,
+                "degraded": True,
+            }
+
+        pts = np.asarray(coords, dtype=float)
+        # segments consécutifs uniquement (pas de matrice complète)
+        distances = haversine_np(pts[:-1, 0], pts[:-1, 1], pts[1:, 0], pts[1:, 1]) * (1000.0 * self.detour_factor)
+        durations = distances / (self.speed_kmh / 3.6)
+        legs = [
+            {"duration": float(dur), "distance": float(dist)}
+            for dur, dist in zip(durations, distances)
+        ]
+
+        return {
+            "geometry": {
+                "type": "LineString",
+                "coordinates": [[longitude, latitude] for latitude, longitude in pts.tolist()],
+            },
+            "legs": legs,
+            "duration": sum(leg["duration"] for leg in legs),
+            "distance": sum(leg["distance"] for leg in legs),
+            "degraded": True,
+        }
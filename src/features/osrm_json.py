@@ -0,0 +1,77 @@
+import json
+from typing import Optional
+
+import numpy as np
+
+# orjson est optionnel (décodage ~2x plus rapide, cf. benchmark en bas de fichier)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(raw: bytes):
+    """Décode une réponse OSRM (orjson si disponible, sinon json)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def decode_table_into(
+    raw: bytes,
+    durations_out: Optional[np.ndarray] = None,
+    distances_out: Optional[np.ndarray] = None,
+) -> dict:
+    """
+    Décode une réponse /table et copie durations/distances directement
+    dans les buffers numpy fournis (vues sur la matrice finale).
+    Les valeurs null (paires non routables) deviennent NaN.
+    Retourne le JSON décodé.
+    """
+    data = loads(raw)
+
+    if durations_out is not None and "durations" in data:
+        durations_out[...] = data["durations"]
+
+    if distances_out is not None and "distances" in data:
+        distances_out[...] = data["distances"]
+
+    return data
+
+
+if __name__ == "__main__":
+    import time
+
+    def _decode_stdlib(raw: bytes, dur: np.ndarray, dist: np.ndarray):
+        data = json.loads(raw)
+        dur[...] = data["durations"]
+        dist[...] = data["distances"]
+
+    rng = np.random.default_rng(42)
+    n_repeat = 20
+
+    print(f"orjson disponible : {orjson is not None}")
+    print(f"{'taille':>8} | {'json (ms)':>10} | {'rapide (ms)':>11} | {'gain':>5}")
+
+    for n in [25, 50, 100, 200, 400]:
+        payload = {
+            "code": "Ok",
+            "durations": rng.uniform(0, 3600, (n, n)).round(1).tolist(),
+            "distances": rng.uniform(0, 50_000, (n, n)).round(1).tolist(),
+        }
+        raw = json.dumps(payload).encode()
+
+        dur = np.empty((n, n), dtype=np.float32)
+        dist = np.empty((n, n), dtype=np.float32)
+
+        start = time.perf_counter()
+        for _ in range(n_repeat):
+            _decode_stdlib(raw, dur, dist)
+        t_stdlib = (time.perf_counter() - start) / n_repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(n_repeat):
+            decode_table_into(raw, dur, dist)
+        t_fast = (time.perf_counter() - start) / n_repeat * 1000
+
+        print(f"{n:>8} | {t_stdlib:>10.2f} | {t_fast:>11.2f} | {t_stdlib / t_fast:>4.1f}x")
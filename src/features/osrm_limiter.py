@@ -0,0 +1,119 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+
+class AIMDLimiter:
+    """
+    Limiteur de concurrence adaptatif (AIMD) pour les requêtes OSRM.
+    - succès : augmentation additive (+increase par "fenêtre" de `limit` requêtes)
+    - erreur (429/503, timeout...) ou pic de latence : réduction multiplicative,
+      au plus une par fenêtre : les signaux des requêtes parties avant la dernière
+      réduction sont ignorés (une rafale d'erreurs concurrentes ne divise qu'une fois)
+    La moyenne de latence est mise à jour à chaque succès, pics compris, pour
+    suivre un changement durable de latence (ex. chunks plus gros).
+    La limite reste entre min_limit et max_limit.
+
+    Les attentes sont des futures créées dans la boucle courante : le limiteur
+    peut être réutilisé par plusieurs asyncio.run successifs.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 20,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_spike_ratio: float = 3.0,   # latence > ratio x moyenne => pic
+        latency_alpha: float = 0.1,         # lissage de la moyenne mobile
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.initial_limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.limit = self.initial_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_spike_ratio = latency_spike_ratio
+        self.latency_alpha = latency_alpha
+
+        self.avg_latency: Optional[float] = None
+        self._last_decrease_at = -math.inf
+        self._in_flight = 0
+        self._waiters: deque = deque()
+
+    # -----------------------------
+    # ACQUISITION
+    # -----------------------------
+
+    async def acquire(self):
+        while self._in_flight >= int(self.limit):
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            finally:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+        self._in_flight += 1
+
+    def release(self):
+        self._in_flight -= 1
+        self._wake_up()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def _wake_up(self):
+        free_slots = int(self.limit) - self._in_flight
+        while free_slots > 0 and self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                free_slots -= 1
+
+    def reset(self):
+        """Repart de l'état initial (boucle asyncio terminée, nouvelle session)."""
+        self._waiters.clear()
+        self._in_flight = 0
+        self.limit = self.initial_limit
+        self.avg_latency = None
+        self._last_decrease_at = -math.inf
+
+    # -----------------------------
+    # RÉGULATION
+    # -----------------------------
+
+    def on_success(self, latency: float):
+        started_at = time.monotonic() - latency
+        if self.avg_latency is None:
+            self.avg_latency = latency
+            spike = False
+        else:
+            spike = latency > self.latency_spike_ratio * self.avg_latency
+            self.avg_latency += self.latency_alpha * (latency - self.avg_latency)
+
+        if spike:
+            # pic de latence : le serveur sature
+            self._decrease(started_at)
+            return
+
+        self.limit = min(self.limit + self.increase / max(self.limit, 1.0), float(self.max_limit))
+        self._wake_up()
+
+    def on_error(self, started_at: Optional[float] = None):
+        """started_at : instant (time.monotonic) d'envoi de la requête en échec."""
+        self._decrease(started_at)
+
+    def _decrease(self, started_at: Optional[float] = None):
+        # requête partie avant la dernière réduction : même fenêtre, déjà prise en compte
+        if started_at is not None and started_at < self._last_decrease_at:
+            return
+        self.limit = max(self.limit * self.decrease_factor, float(self.min_limit))
+        self._last_decrease_at = time.monotonic()
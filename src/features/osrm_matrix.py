@@ -0,0 +1,178 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Tuple
+
+import numpy as np
+import polars as pl
+
+
+class BlockDiagonalMatrix:
+    """
+    Matrice OSRM NxN stockée par blocs : une sous-matrice dense par cluster (jour).
+    - s'indexe comme un np.ndarray : m[i, j] avec i, j des osrm_index
+    - les paires inter-clusters valent `fill_value` (jamais calculées)
+    - si has_anchor, chaque bloc contient en dernière ligne/colonne le point d'ancrage
+    """
+
+    def __init__(
+        self,
+        blocks: Dict[Any, np.ndarray],
+        members: Dict[Any, np.ndarray],
+        has_anchor: bool = False,
+        fill_value: float = np.inf,
+    ):
+        self.blocks = blocks
+        self.members = members
+        self.has_anchor = has_anchor
+        self.fill_value = fill_value
+
+        self.cluster_ids: List[Any] = list(blocks.keys())
+        self._blocks_list = [blocks[c] for c in self.cluster_ids]
+
+        n = sum(len(m) for m in members.values())
+        # osrm_index -> (position du bloc, index local dans le bloc)
+        self._block_pos = np.full(n, -1, dtype=np.int64)
+        self._local_index = np.full(n, -1, dtype=np.int64)
+        for pos, cluster_id in enumerate(self.cluster_ids):
+            idx = np.asarray(members[cluster_id], dtype=np.int64)
+            self._block_pos[idx] = pos
+            self._local_index[idx] = np.arange(len(idx))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        n = len(self._block_pos)
+        return (n, n)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._blocks_list)
+
+    def __getitem__(self, key):
+        i, j = key
+        pos = self._block_pos[i]
+        if pos != self._block_pos[j]:
+            return self.fill_value
+        return self._blocks_list[pos][self._local_index[i], self._local_index[j]]
+
+    def block(self, cluster_id) -> np.ndarray:
+        """Sous-matrice dense d'un cluster (ancre incluse le cas échéant)."""
+        return self.blocks[cluster_id]
+
+    def from_anchor(self, i: int) -> float:
+        """Coût ancre -> osrm_index i."""
+        if not self.has_anchor:
+            raise ValueError("La matrice n'a pas été calculée avec un point d'ancrage")
+        block = self._blocks_list[self._block_pos[i]]
+        return block[-1, self._local_index[i]]
+
+    def to_anchor(self, i: int) -> float:
+        """Coût osrm_index i -> ancre."""
+        if not self.has_anchor:
+            raise ValueError("La matrice n'a pas été calculée avec un point d'ancrage")
+        block = self._blocks_list[self._block_pos[i]]
+        return block[self._local_index[i], -1]
+
+    def to_dense(self) -> np.ndarray:
+        """Matrice NxN complète (fill_value hors des blocs), sans l'ancre."""
+        dense = np.full(self.shape, self.fill_value, dtype=float)
+        for cluster_id, block in zip(self.cluster_ids, self._blocks_list):
+            idx = np.asarray(self.members[cluster_id], dtype=np.int64)
+            n_c = len(idx)
+            dense[np.ix_(idx, idx)] = block[:n_c, :n_c]
+        return dense
+
+
+@dataclass
+class OSRMMatrix:
+    """
+    Résultat typé d'un calcul de matrices OSRM (durées + distances).
+    - durations / distances : float32, NxN dense ou BlockDiagonalMatrix
+    - index : osrm_index correspondant à chaque ligne/colonne
+    - profile : profil OSRM utilisé
+    - failed_blocks : blocs {"sources", "destinations", "error"} non obtenus d'OSRM
+    - degraded : True si tout ou partie des valeurs sont des estimations haversine
+    Persistance Parquet au format long (src_index, dst_index, duration, distance).
+    """
+    durations: np.ndarray | BlockDiagonalMatrix
+    distances: np.ndarray | BlockDiagonalMatrix
+    index: np.ndarray
+    profile: str = "driving"
+    failed_blocks: List[Dict[str, Any]] = field(default_factory=list)
+    degraded: bool = False
+
+    @property
+    def n(self) -> int:
+        return len(self.index)
+
+    def get(self, metric: Literal["distance", "duration"]) -> np.ndarray | BlockDiagonalMatrix:
+        if metric == "duration":
+            return self.durations
+        if metric == "distance":
+            return self.distances
+        raise ValueError(f"Métrique inconnue : {metric}")
+
+    # -----------------------------
+    # FORMAT LONG
+    # -----------------------------
+
+    def to_long(self) -> pl.DataFrame:
+        """
+        Une ligne par paire calculée : (src_index, dst_index, duration, distance, profile).
+        Pour une matrice par blocs, seules les paires intra-cluster sont écrites.
+        """
+        if isinstance(self.durations, BlockDiagonalMatrix):
+            parts = []
+            for cluster_id in self.durations.cluster_ids:
+                members = np.asarray(self.durations.members[cluster_id], dtype=np.int64)
+                n_c = len(members)
+                parts.append((
+                    members,
+                    self.durations.block(cluster_id)[:n_c, :n_c],
+                    self.distances.block(cluster_id)[:n_c, :n_c],
+                ))
+        else:
+            parts = [(np.arange(self.n), self.durations, self.distances)]
+
+        frames = []
+        for members, dur, dist in parts:
+            src, dst = np.meshgrid(members, members, indexing="ij")
+            frames.append(pl.DataFrame({
+                "src_index": self.index[src.ravel()],
+                "dst_index": self.index[dst.ravel()],
+                "duration": np.asarray(dur, dtype=np.float32).ravel(),
+                "distance": np.asarray(dist, dtype=np.float32).ravel(),
+            }))
+
+        return (
+            pl.concat(frames)
+            .with_columns(pl.lit(self.profile).cast(pl.Categorical).alias("profile"))
+        )
+
+    @classmethod
+    def from_long(cls, df: pl.DataFrame) -> "OSRMMatrix":
+        """Reconstruit une matrice dense (NaN pour les paires absentes)."""
+        index = np.unique(np.concatenate([
+            df["src_index"].to_numpy(),
+            df["dst_index"].to_numpy(),
+        ]))
+        n = len(index)
+        i = np.searchsorted(index, df["src_index"].to_numpy())
+        j = np.searchsorted(index, df["dst_index"].to_numpy())
+
+        durations = np.full((n, n), np.nan, dtype=np.float32)
+        distances = np.full((n, n), np.nan, dtype=np.float32)
+        durations[i, j] = df["duration"].to_numpy()
+        distances[i, j] = df["distance"].to_numpy()
+
+        profile = str(df["profile"][0]) if "profile" in df.columns and df.height else "driving"
+        return cls(durations=durations, distances=distances, index=index, profile=profile)
+
+    def write_parquet(self, path: str | Path) -> str:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.to_long().write_parquet(path)
+        return str(path)
+
+    @classmethod
+    def read_parquet(cls, path: str | Path) -> "OSRMMatrix":
+        return cls.from_long(pl.read_parquet(path))
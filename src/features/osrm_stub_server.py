@@ -0,0 +1,244 @@
+import asyncio
+import random
+import sys
+from typing import Optional
+
+import numpy as np
+from aiohttp import web
+
+from src.features.osrm_fallback import HaversineClient
+
+
+class OSRMStubServer:
+    """
+    Serveur HTTP local imitant OSRM (/table/v1 et /route/v1) pour les tests
+    de charge et les benchmarks, sans données routières :
+    - durées/distances estimées par HaversineClient (vitesse + détour par profil)
+    - routes en lignes droites entre waypoints
+    - latence configurable (fixe + jitter) et injection d'erreurs HTTP
+    - tirages aléatoires reproductibles (seed)
+    Les compteurs (requêtes, erreurs, concurrence max) sont exposés dans `stats`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,                 # 0 : port libre choisi par l'OS
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        max_table_size: int = 100,     # comme --max-table-size d'osrm-routed
+        seed: Optional[int] = 42,
+    ):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_table_size = max_table_size
+        self.rng = random.Random(seed)
+
+        self.stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+        self._runner: Optional[web.AppRunner] = None
+
+    # -----------------------------
+    # CYCLE DE VIE
+    # -----------------------------
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/table/v1/{profile}/{coords}", self._handle_table)
+        app.router.add_get("/route/v1/{profile}/{coords}", self._handle_route)
+        return app
+
+    async def start(self) -> "OSRMStubServer":
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "OSRMStubServer":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def reset_stats(self):
+        for key in self.stats:
+            self.stats[key] = 0
+
+    # -----------------------------
+    # OUTILS
+    # -----------------------------
+
+    @staticmethod
+    def _parse_coords(raw: str):
+        """'lon,lat;lon,lat' -> [(latitude, longitude), ...]"""
+        coords = []
+        for pair in raw.split(";"):
+            longitude, latitude = pair.split(",")
+            coords.append((float(latitude), float(longitude)))
+        return coords
+
+    @staticmethod
+    def _parse_indices(raw: Optional[str], n: int):
+        if raw is None or raw == "all":
+            return list(range(n))
+        return [int(i) for i in raw.split(";")]
+
+    @staticmethod
+    def _error(status: int, code: str, message: str) -> web.Response:
+        return web.json_response({"code": code, "message": message}, status=status)
+
+    async def _simulate(self) -> Optional[web.Response]:
+        """Latence simulée puis, éventuellement, erreur injectée."""
+        delay_ms = self.latency_ms + self.rng.uniform(0, self.latency_jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+        if self.error_rate > 0 and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return self._error(self.error_status, "Overloaded", "Erreur injectée")
+        return None
+
+    def _track(self, delta: int):
+        self.stats["in_flight"] += delta
+        if delta > 0:
+            self.stats["requests"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    # -----------------------------
+    # HANDLERS
+    # -----------------------------
+
+    async def _handle_table(self, request: web.Request) -> web.Response:
+        self._track(+1)
+        try:
+            error = await self._simulate()
+            if error is not None:
+                return error
+
+            try:
+                client = HaversineClient(profile=request.match_info["profile"])
+                coords = self._parse_coords(request.match_info["coords"])
+                sources = self._parse_indices(request.query.get("sources"), len(coords))
+                destinations = self._parse_indices(request.query.get("destinations"), len(coords))
+            except ValueError as e:
+                return self._error(400, "InvalidQuery", str(e))
+
+            if len(sources) * len(destinations) > self.max_table_size ** 2:
+                return self._error(400, "TooBig", "Too many table coordinates")
+
+            durations, distances = client.matrix(
+                [coords[i] for i in sources],
+                [coords[j] for j in destinations],
+            )
+
+            annotations = request.query.get("annotations", "duration").split(",")
+            body = {"code": "Ok"}
+            if "duration" in annotations:
+                body["durations"] = np.round(durations, 1).tolist()
+            if "distance" in annotations:
+                body["distances"] = np.round(distances, 1).tolist()
+
+            return web.json_response(body)
+        finally:
+            self._track(-1)
+
+    async def _handle_route(self, request: web.Request) -> web.Response:
+        self._track(+1)
+        try:
+            error = await self._simulate()
+            if error is not None:
+                return error
+
+            try:
+                client = HaversineClient(profile=request.match_info["profile"])
+                coords = self._parse_coords(request.match_info["coords"])
+            except ValueError as e:
+                return self._error(400, "InvalidQuery", str(e))
+
+            route = await client.route_geojson_multi(coords)
+
+            return web.json_response({
+                "code": "Ok",
+                "routes": [{
+                    "geometry": route["geometry"],
+                    "legs": route["legs"],
+                    "duration": route["duration"],
+                    "distance": route["distance"],
+                }],
+                "waypoints": [{"location": [longitude, latitude]} for latitude, longitude in coords],
+            })
+        finally:
+            self._track(-1)
+
+
+def serve(port: int = 5000, **options):
+    """Lance le serveur au premier plan (remplace osrm-routed sur localhost:5000)."""
+    web.run_app(OSRMStubServer(port=port, **options).make_app(), host="127.0.0.1", port=port)
+
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+    from pathlib import Path
+
+    from src.features.osrm import OSRMClientAsync
+    from src.features.osrm_cache import OSRMMatrixCache
+
+    if len(sys.argv) < 2 or sys.argv[1] != "bench":
+        serve(port=5000)
+        sys.exit(0)
+
+    # python -m src.features.osrm_stub_server bench
+    rng = np.random.default_rng(0)
+
+    async def run_scenario(stub, name, coords, **client_options):
+        stub.reset_stats()
+        client = OSRMClientAsync(local_url=stub.url, public_url=stub.url, **client_options)
+        async with client:
+            start = time.perf_counter()
+            matrix = await client.table(coords)
+            elapsed = time.perf_counter() - start
+        print(
+            f"{name:<28} | {len(coords):>4} | {elapsed * 1000:>8.1f} | {stub.stats['requests']:>5} | "
+            f"{stub.stats['errors']:>5} | {stub.stats['max_in_flight']:>4} | {len(matrix.failed_blocks):>6}"
+        )
+
+    async def main():
+        print(f"{'scénario':<28} | {'N':>4} | {'ms':>8} | {'req':>5} | {'err':>5} | {'conc':>4} | {'échecs':>6}")
+        async with OSRMStubServer(latency_ms=20, latency_jitter_ms=10) as stub:
+            for n in (100, 300):
+                coords = [tuple(c) for c in rng.uniform([48.80, 2.25], [48.90, 2.42], (n, 2))]
+
+                for chunk in (25, 50, 100):
+                    await run_scenario(stub, f"chunk={chunk}", coords, max_chunk_size=chunk)
+
+                await run_scenario(stub, "foot (symétrique)", coords, profile="foot")
+
+                with tempfile.TemporaryDirectory() as tmp:
+                    cache = OSRMMatrixCache(Path(tmp) / "pairs.sqlite")
+                    await run_scenario(stub, "cache froid", coords, cache=cache)
+                    await run_scenario(stub, "cache chaud", coords, cache=cache)
+                    new_coords = [tuple(c) for c in rng.uniform([48.80, 2.25], [48.90, 2.42], (n // 10, 2))]
+                    await run_scenario(stub, "cache +10% nouveaux POIs", coords + new_coords, cache=cache)
+
+            stub.error_rate = 0.2
+            coords = [tuple(c) for c in rng.uniform([48.80, 2.25], [48.90, 2.42], (300, 2))]
+            await run_scenario(stub, "20% d'erreurs 503", coords, backoff_base=0.05, degraded_mode=False)
+
+    asyncio.run(main())
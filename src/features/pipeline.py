@@ -1,15 +1,22 @@
 import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 import asyncio
 
 import polars as pl
 
+from src.data.etl.utils.admin_index import AdminH3Index
+from src.data.etl.utils.dataset import load_commune_index, scan_pois
 from src.features.poi_filter import POIFilter
 from src.features.spatial_clustering import SpatialClusterer
-from src.features.post_clustering import build_osrm_ready_pois, build_osrm_matrices_async
+from src.features.post_clustering import (
+    build_osrm_ready_pois,
+    build_osrm_matrices_async,
+    build_osrm_block_matrices_async,
+)
 from src.features.itinerary_optimizer import ItineraryOptimizer
 from src.features.osrm import OSRMClientAsync
+from src.features.osrm_matrix import OSRMMatrix
 
 
 DEFAULT_VISIT_TIME = 45 * 60  # 45 minutes en secondes
@@ -25,16 +32,20 @@ class ItineraryPipeline:
         6. Enrichissement / assemblage multi-jour
     """
 
-    def __init__(self, pois_path: Path):
+    def __init__(self, pois_path: Path, admin_index: Optional[AdminH3Index] = None):
+        # pois_path : merged_*.parquet ou dataset partitionné merged_*/
+        # admin_index : index commune -> cellules H3 (chemin rapide du filtre commune)
         self.pois_path = pois_path
-        self.pois_lf = pl.scan_parquet(self.pois_path)
+        self.pois_lf = scan_pois(self.pois_path)
+        self.commune_index = load_commune_index(self.pois_path)
+        self.admin_index = admin_index
 
     # ---------------------------------------------------------
     # FILTRAGE
     # ---------------------------------------------------------
     def _filter_pois(self, commune, main_categories, min_score):
         return (
-            POIFilter(self.pois_lf)
+            POIFilter(self.pois_lf, commune_index=self.commune_index, admin_index=self.admin_index)
             .set_commune(commune)
             .set_categories(main_categories=main_categories)
             .set_min_score(min_score)
@@ -94,15 +105,38 @@ class ItineraryPipeline:
         self,
         df_clustered: pl.DataFrame,
         osrm: OSRMClientAsync,
-    ) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+        per_cluster: bool = False,
+        anchor: tuple[float, float] | None = None,
+    ) -> tuple[pl.DataFrame, OSRMMatrix]:
         """
         Appelle build_osrm_matrices_async en masquant asyncio.run
         pour garder une API synchrone dans le pipeline.
+        per_cluster=True : une matrice par cluster (BlockDiagonalMatrix)
+        au lieu d'une matrice globale.
+        anchor (optionnel, per_cluster uniquement) : ajoute le point d'ancrage
+        à chaque bloc ; inutile tant que solve_day n'exploite pas ces trajets.
+        Retourne (df_clustered, OSRMMatrix).
         """
-        df_clustered, df_osrm_dist, df_osrm_dur = asyncio.run(
-            build_osrm_matrices_async(df_clustered, osrm)
-        )
-        return df_clustered, df_osrm_dist, df_osrm_dur
+        async def _run():
+            # la session OSRM est liée à la boucle créée par asyncio.run
+            async with osrm:
+                if per_cluster:
+                    return await build_osrm_block_matrices_async(df_clustered, osrm, anchor=anchor)
+                return await build_osrm_matrices_async(df_clustered, osrm)
+
+        df_clustered, osrm_matrix = asyncio.run(_run())
+
+        if osrm_matrix.failed_blocks:
+            n_failed = sum(
+                len(block["sources"]) * len(block["destinations"])
+                for block in osrm_matrix.failed_blocks
+            )
+            print(f"[OSRM] {len(osrm_matrix.failed_blocks)} blocs en échec ({n_failed} paires)")
+
+        if osrm_matrix.degraded:
+            print("[OSRM] mode dégradé : durées/distances estimées (haversine) pour tout ou partie des paires")
+
+        return df_clustered, osrm_matrix
 
     # ---------------------------------------------------------
     # TSP / ITINÉRAIRE
@@ -110,11 +144,11 @@ class ItineraryPipeline:
     def _compute_itinerary(
         self,
         df_clustered: pl.DataFrame,
-        df_osrm_dur: pl.DataFrame,
+        osrm_matrix: OSRMMatrix,
     ):
-        optimizer = ItineraryOptimizer.from_list_matrix(
+        optimizer = ItineraryOptimizer.from_osrm_matrix(
             df_pois=df_clustered,
-            matrix=df_osrm_dur.to_numpy(),
+            osrm_matrix=osrm_matrix,
             metric="duration",
         )
         df_itinerary = optimizer.solve_all_days()
@@ -192,12 +226,14 @@ class ItineraryPipeline:
         osrm_min_score: float = 0.2,
         target_restaurants: int = 2,
         restaurant_category: str = "Gastronomie & Restauration",
+        osrm_per_cluster: bool = False,
     ):
         """
         Pipeline synchrone de bout en bout.
+        osrm_per_cluster=True : matrices OSRM calculées par cluster (jour).
         Retourne :
             - df_clustered prêt OSRM
-            - df_osrm_dist, df_osrm_dur
+            - osrm_matrix (OSRMMatrix : durées + distances)
             - df_itinerary
             - optimizer (pour routes GeoJSON, etc.)
         """
@@ -219,12 +255,13 @@ class ItineraryPipeline:
         )
 
         # 4. OSRM matrices (async → sync)
-        df_clustered, df_osrm_dist, df_osrm_dur = self._compute_osrm_matrices(
+        df_clustered, osrm_matrix = self._compute_osrm_matrices(
             df_clustered=df_clustered,
             osrm=osrm,
+            per_cluster=osrm_per_cluster,
         )
 
         # 5. Itinéraire optimisé
-        optimizer, df_itinerary = self._compute_itinerary(df_clustered, df_osrm_dur)
+        optimizer, df_itinerary = self._compute_itinerary(df_clustered, osrm_matrix)
 
-        return df_clustered, df_osrm_dist, df_osrm_dur, df_itinerary, optimizer
\ No newline at end of file
+        return df_clustered, osrm_matrix, df_itinerary, optimizer
\ No newline at end of file
@@ -1,6 +1,11 @@
+import numpy as np
 import polars as pl
 from typing import Optional, List
 
+from src.data.etl.utils.admin_index import AdminH3Index
+from src.data.etl.utils.dataset import PARTITION_COLS, SORT_COL, load_commune_index, scan_pois
+from src.data.etl.utils.h3_utils import h3_columns_to_uint64
+
 
 class POIFilter:
     """
@@ -9,11 +14,23 @@ class POIFilter:
     ainsi que les filtres internes (score final).
     """
 
-    def __init__(self, pois_lf: pl.LazyFrame):
+    def __init__(
+        self,
+        pois_lf: pl.LazyFrame,
+        commune_index: Optional[pl.DataFrame] = None,
+        admin_index: Optional[AdminH3Index] = None,
+    ):
         """
         Initialise le filtre avec un LazyFrame de POIs.
+        Les colonnes H3 encore en chaînes (anciens Parquet) sont converties en uint64.
+        commune_index : index des communes d'un dataset partitionné (cf. from_path),
+        permet d'élaguer partitions et row groups lors d'un filtre par commune.
+        admin_index : index commune -> cellules H3 (polygones), active le chemin
+        rapide de set_commune (semi-join sur les cellules triées).
         """
-        self.lf = pois_lf
+        self.lf = h3_columns_to_uint64(pois_lf)
+        self.commune_index = commune_index
+        self.admin_index = admin_index
 
         # paramètres utilisateur
         self.region: Optional[str] = None
@@ -24,6 +41,11 @@ class POIFilter:
         # paramètre interne
         self.min_score: Optional[float] = None
 
+    @classmethod
+    def from_path(cls, path, admin_index: Optional[AdminH3Index] = None) -> "POIFilter":
+        """Fichier merged_*.parquet ou dataset partitionné merged_*/ (+ son index)."""
+        return cls(scan_pois(path), commune_index=load_commune_index(path), admin_index=admin_index)
+
     # -----------------------------
     # SETTERS
     # -----------------------------
@@ -67,6 +89,8 @@ class POIFilter:
 
         # Filtre commune
         if self.commune:
+            lf = self._prune_commune(lf)
+            lf = self._join_commune_cells(lf)
             lf = lf.filter(pl.col("commune") == self.commune)
 
         # Filtre main_category
@@ -83,19 +107,71 @@ class POIFilter:
 
         return lf
 
+    def _prune_commune(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Traduit le filtre commune pour un dataset partitionné :
+        - colonnes de partition (région) -> seuls les répertoires concernés sont lus ;
+        - plage [h3_min, h3_max] de la commune -> row groups hors plage ignorés
+          (fichiers triés par cellule H3).
+        Le filtre exact sur commune reste appliqué ensuite.
+        """
+        if self.commune_index is None:
+            return lf
+
+        rows = self.commune_index.filter(pl.col("commune") == self.commune)
+        if rows.is_empty():
+            return lf
+
+        for col in PARTITION_COLS:
+            keys = rows[col].unique()
+            predicate = pl.col(col).is_in(keys.drop_nulls().implode())
+            # is_in ne retient jamais null : partition __HIVE_DEFAULT_PARTITION__
+            if keys.null_count() > 0:
+                predicate = predicate | pl.col(col).is_null()
+            lf = lf.filter(predicate)
+
+        h3_ranges = [
+            pl.col(SORT_COL).is_between(h3_min, h3_max)
+            for h3_min, h3_max in rows.select("h3_min", "h3_max").unique().iter_rows()
+        ]
+        return lf.filter(pl.any_horizontal(h3_ranges))
+
+    def _join_commune_cells(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Chemin rapide avec l'index admin -> H3 (polygones) :
+        - plage [min, max] des cellules de la commune -> pruning des row groups ;
+        - semi-join sur les cellules triées (uint64) : seuls les POIs des cellules
+          couvrant le polygone sont gardés, avant le filtre exact sur commune
+          (toujours appliqué : les cellules de bord débordent sur les communes voisines).
+        """
+        if self.admin_index is None:
+            return lf
+
+        cells = self.admin_index.cells("commune", self.commune)
+        if cells is None:
+            return lf
+
+        h3_col = f"h3_r{self.admin_index.resolution('commune')}"
+        cells_lf = pl.LazyFrame(
+            pl.Series(h3_col, np.asarray(cells), dtype=pl.UInt64).set_sorted().to_frame()
+        )
+
+        return (
+            lf.filter(pl.col(h3_col).is_between(int(cells[0]), int(cells[-1])))
+            .join(cells_lf, on=h3_col, how="semi")
+        )
+
 
 if __name__ == "__main__":
     import time
     from pathlib import Path
-    import json
     
     DATA_DIR = Path("../../data/processed").absolute()
-    with open(DATA_DIR /"admin_hexes.json", "r", encoding="utf-8") as f:
-        admin_hexes = json.load(f)
+    admin_index = AdminH3Index(DATA_DIR / "admin_h3_index")
     commune = "Annecy"
     region = "Auvergne Rhone Alpes"
 
-    pois_lf= pl.scan_parquet(DATA_DIR / "merged_20260101_234939.parquet")
+    pois_lf = h3_columns_to_uint64(pl.scan_parquet(DATA_DIR / "merged_20260101_234939.parquet"))
     print(f"Total rows: {len(pois_lf.collect())}")
     
     print("=== POI Filter ===")
@@ -124,21 +200,44 @@ if __name__ == "__main__":
     print(f"Total time: {end_time_region - start_time_region:.2f} seconds")   
     print()
 
-    print("=== POI Filter with h3 ===")
+    print("=== POI Filter with h3 (index admin, polygones) ===")
     print("Commune")
     start_time_h3_commune = time.perf_counter()
-    hexes_paris = admin_hexes["commune"][commune]
-    pois_paris = pois_lf.filter(pl.col("h3_r8").is_in(hexes_paris))
-    print(f"Filtered rows: {len(pois_paris.collect())}")
+    filtered_h3_commune = POIFilter(pois_lf, admin_index=admin_index).set_commune(commune).apply()
+    print(f"Filtered rows: {len(filtered_h3_commune.collect())}")
     end_time_h3_commune = time.perf_counter()
     print(f"Total time: {end_time_h3_commune - start_time_h3_commune:.2f} seconds")
     
     print("Région")
     start_time_h3_region = time.perf_counter()
-    hexes_region = admin_hexes["region"]["Auvergne-Rhône-Alpes"]
+    hexes_region = pl.Series("h3_r6", admin_index.cells("region", "Auvergne-Rhône-Alpes"), dtype=pl.UInt64)
     print(f"Hexes region: {len(hexes_region)}")
 
-    pois_region = pois_lf.filter(pl.col("h3_r8").is_in(hexes_region))
+    pois_region = pois_lf.join(hexes_region.set_sorted().to_frame().lazy(), on="h3_r6", how="semi")
     print(f"Filtered rows: {len(pois_region.collect())}")
     end_time_h3_region = time.perf_counter()
-    print(f"Total time: {end_time_h3_region - start_time_h3_region:.2f} seconds")
\ No newline at end of file
+    print(f"Total time: {end_time_h3_region - start_time_h3_region:.2f} seconds")
+    print()
+
+    print("=== POI Filter sur dataset partitionné (region=…, trié par h3_r8) ===")
+    from src.data.etl.save import write_parquet_dataset
+
+    dataset_dir = DATA_DIR / "merged_20260101_234939"
+    if not dataset_dir.exists():
+        start_time_write = time.perf_counter()
+        write_parquet_dataset(pois_lf, dataset_dir)
+        print(f"Écriture du dataset : {time.perf_counter() - start_time_write:.2f} seconds")
+
+    print("Commune")
+    start_time_ds_commune = time.perf_counter()
+    filtered_ds_commune = POIFilter.from_path(dataset_dir, admin_index=admin_index).set_commune(commune).apply()
+    print(f"Filtered rows: {len(filtered_ds_commune.collect())}")
+    end_time_ds_commune = time.perf_counter()
+    print(f"Total time: {end_time_ds_commune - start_time_ds_commune:.2f} seconds")
+
+    print("Région")
+    start_time_ds_region = time.perf_counter()
+    filtered_ds_region = POIFilter.from_path(dataset_dir).set_region(region).apply()
+    print(f"Filtered rows: {len(filtered_ds_region.collect())}")
+    end_time_ds_region = time.perf_counter()
+    print(f"Total time: {end_time_ds_region - start_time_ds_region:.2f} seconds")
@@ -1,10 +1,12 @@
 from __future__ import annotations
 import polars as pl
-import math
+import asyncio
 import numpy as np
-from typing import Literal, Dict
+from typing import Literal, Dict, Optional, Tuple
 
+from src.data.etl.utils.geo import haversine_expr
 from src.features.osrm import OSRMClientAsync
+from src.features.osrm_matrix import BlockDiagonalMatrix, OSRMMatrix
 
 TransportMode = Literal["walk", "bike", "car"]
 
@@ -20,31 +22,6 @@ DEFAULT_MAX_POIS_PER_CLUSTER = 40
 # Nombre cible de restaurants par jour/cluster
 TARGET_RESTAURANTS_PER_CLUSTER = 2
 
-# ------------------------------------------
-# haversine en Polars
-# ------------------------------------------
-def haversine_single(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
-    R = 6371.0  # km
-    latitude1, longitude1, latitude2, longitude2 = map(math.radians, [latitude1, longitude1, latitude2, longitude2])
-    dlat = latitude2 - latitude1
-    dlongitude = longitude2 - longitude1
-    a = math.sin(dlat / 2) ** 2 + math.cos(latitude1) * math.cos(latitude2) * math.sin(dlongitude / 2) ** 2
-    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-  
-def haversine_expr(latitude1_col: str, longitude1_col: str, latitude2_col: str, longitude2_col: str) -> pl.Expr:
-    return (
-        pl.struct([latitude1_col, longitude1_col, latitude2_col, longitude2_col])
-        .map_elements(
-            lambda s: haversine_single(
-                s[latitude1_col],
-                s[longitude1_col],
-                s[latitude2_col],
-                s[longitude2_col],
-            ),
-            return_dtype=pl.Float64,
-        )
-    )
-
 # ------------------------------------------
 # Score filtering
 # ------------------------------------------
@@ -323,10 +300,14 @@ def build_osrm_ready_pois(
 async def build_osrm_matrices_async(
     df_clustered: pl.DataFrame,
     osrm: OSRMClientAsync,
-):
+) -> tuple[pl.DataFrame, OSRMMatrix]:
+    """
+    Matrice OSRM globale sur tous les POIs.
+    Retourne (df_clustered avec osrm_index, OSRMMatrix) ; la ligne i de la
+    matrice correspond à osrm_index == i.
+    """
     # 1) Extraire coords (latitude, longitude)
-    coords = df_clustered.select(["latitude", "longitude"]).to_numpy().tolist()
-    coords = [tuple(row) for row in coords]
+    coords = list(zip(df_clustered["latitude"].to_list(), df_clustered["longitude"].to_list()))
 
     # 2) Ajouter osrm_index
     df_clustered = df_clustered.with_columns(
@@ -334,14 +315,79 @@ async def build_osrm_matrices_async(
     )
 
     # 3) Appel OSRM asynchrone
-    result = await osrm.table(coords, annotations="duration,distance")
+    osrm_matrix = await osrm.table(coords, annotations="duration,distance")
+
+    return df_clustered, osrm_matrix
+
+
+async def build_osrm_block_matrices_async(
+    df_clustered: pl.DataFrame,
+    osrm: OSRMClientAsync,
+    anchor: Optional[Tuple[float, float]] = None,
+):
+    """
+    Variante de build_osrm_matrices_async : une matrice OSRM par cluster,
+    calculées en parallèle, au lieu d'une matrice globale.
+    Le coût OSRM devient Σ(n_jour²) au lieu de (Σn_jour)².
+
+    anchor (latitude, longitude) : ajouté en dernière ligne/colonne de chaque bloc.
+    Retourne (df_clustered, OSRMMatrix) dont durations/distances sont des
+    BlockDiagonalMatrix indexables par osrm_index.
+    """
+    # 1) Ajouter osrm_index (même convention que la matrice globale)
+    df_clustered = df_clustered.with_columns(
+        pl.Series("osrm_index", list(range(len(df_clustered))))
+    )
+
+    # 2) Regrouper les POIs par cluster
+    groups = (
+        df_clustered
+        .group_by("cluster_id", maintain_order=True)
+        .agg(["osrm_index", "latitude", "longitude"])
+    )
 
-    # 4) Extraire matrices
-    dist_matrix = np.array(result["distances"])
-    dur_matrix = np.array(result["durations"])
+    members = {}
+    cluster_coords = {}
+    for cluster_id, osrm_indices, lats, lons in groups.iter_rows():
+        coords = list(zip(lats, lons))
+        if anchor is not None:
+            coords.append(tuple(anchor))
+        members[cluster_id] = np.array(osrm_indices, dtype=np.int64)
+        cluster_coords[cluster_id] = coords
+
+    # 3) Appels OSRM concurrents, un par cluster
+    results = await asyncio.gather(*(
+        osrm.table(coords, annotations="duration,distance")
+        for coords in cluster_coords.values()
+    ))
+
+    # 4) Assemblage des blocs
+    dist_blocks = {}
+    dur_blocks = {}
+    failed_blocks = []
+    for cluster_id, result in zip(cluster_coords.keys(), results):
+        dist_blocks[cluster_id] = result.distances
+        dur_blocks[cluster_id] = result.durations
+
+        # indices locaux -> osrm_index (l'ancre, hors index global, vaut -1)
+        local_to_osrm = np.append(members[cluster_id], -1) if anchor is not None else members[cluster_id]
+        failed_blocks.extend(
+            {
+                "sources": local_to_osrm[block["sources"]],
+                "destinations": local_to_osrm[block["destinations"]],
+                "error": block["error"],
+            }
+            for block in result.failed_blocks
+        )
 
-    # 5) Convertir en DataFrames Polars
-    df_osrm_dist = pl.DataFrame(dist_matrix).with_row_index("osrm_index")
-    df_osrm_dur = pl.DataFrame(dur_matrix).with_row_index("osrm_index")
+    has_anchor = anchor is not None
+    osrm_matrix = OSRMMatrix(
+        durations=BlockDiagonalMatrix(dur_blocks, members, has_anchor=has_anchor),
+        distances=BlockDiagonalMatrix(dist_blocks, members, has_anchor=has_anchor),
+        index=np.arange(len(df_clustered), dtype=np.int64),
+        profile=osrm.profile,
+        failed_blocks=failed_blocks,
+        degraded=any(result.degraded for result in results),
+    )
 
-    return df_clustered, df_osrm_dist, df_osrm_dur
+    return df_clustered, osrm_matrix
@@ -3,7 +3,9 @@ from typing import Optional
 import polars as pl
 import numpy as np
 from sklearn.cluster import KMeans
-import h3
+from h3.api import basic_int as h3_int
+
+from src.data.etl.utils.h3_utils import h3_columns_to_uint64
 
 
 class SpatialClusterer:
@@ -12,7 +14,7 @@ class SpatialClusterer:
     en utilisant H3 + KMeans, avec prise en compte d'un point d'ancrage.
 
     Pipeline logique :
-        - on travaille au niveau des cellules H3 (h3_8)
+        - on travaille au niveau des cellules H3 (h3_r8, uint64)
         - on regroupe les POIs par cellule et calcule un centroïde (latitude/longitude moyen)
         - on ajoute le point d'ancrage comme "cellule virtuelle"
         - on applique KMeans pour répartir les cellules entre les jours
@@ -20,7 +22,8 @@ class SpatialClusterer:
     """
 
     def __init__(self, pois_lf: pl.LazyFrame):
-        self.lf = pois_lf
+        # anciens Parquet : cellules H3 en chaînes -> uint64
+        self.lf = h3_columns_to_uint64(pois_lf)
         self.nb_days: int = 1
         self.anchor_lat: Optional[float] = None
         self.anchor_lon: Optional[float] = None
@@ -66,7 +69,7 @@ class SpatialClusterer:
             self.lf
             .group_by("h3_r8")
             .agg([
-                pl.count().alias("n_pois"),
+                pl.len().alias("n_pois"),
                 pl.mean("latitude").alias("latitude_center"),
                 pl.mean("longitude").alias("longitude_center"),
             ])
@@ -82,14 +85,14 @@ class SpatialClusterer:
         if self.anchor_lat is None or self.anchor_lon is None:
             return cells_df
 
-        anchor_h3 = h3.latlng_to_cell(self.anchor_lat, self.anchor_lon, self.h3_resolution)
+        anchor_h3 = h3_int.latlng_to_cell(self.anchor_lat, self.anchor_lon, self.h3_resolution)
 
         # Si l'ancrage est déjà dans une cellule existante, on ne duplique pas
-        if anchor_h3 in cells_df["h3_r8"].to_list():
+        if (cells_df["h3_r8"] == anchor_h3).any():
             return cells_df
 
         anchor_row = pl.DataFrame({
-            "h3_r8": [anchor_h3],
+            "h3_r8": pl.Series([anchor_h3], dtype=pl.UInt64),
             "n_pois": [0],  # pas de POI, juste un point d'attraction
             "latitude_center": [self.anchor_lat],
             "longitude_center": [self.anchor_lon],
@@ -9,6 +9,7 @@ from src.features.poi_selector import POISelector
 from src.features.post_clustering import build_osrm_matrices_async
 #from src.features.itinerary_optimizer import ItineraryOptimizer
 from src.features.osrm import OSRMClientAsync
+from src.features.osrm_cache import OSRMMatrixCache
 from src.data.etl.save import save_parquet
 
 
@@ -128,16 +129,20 @@ def main():
     ################################
     
     # 4. construction des matrices
-    osrm = OSRMClientAsync()
-    df_clustered, df_osrm_dist, df_osrm_dur = asyncio.run(build_osrm_matrices_async(lf_osrm_ready, osrm))
+    osrm = OSRMClientAsync(cache=OSRMMatrixCache(OUTPUT_PATH / "osrm_cache.sqlite"))
 
-    print(df_clustered)
-    print(df_osrm_dist)
+    async def _build_matrices():
+        async with osrm:
+            return await build_osrm_matrices_async(lf_osrm_ready, osrm)
+
+    df_clustered, osrm_matrix = asyncio.run(_build_matrices())
 
-    print(df_osrm_dur)
+    print(df_clustered)
+    print(osrm_matrix.durations)
+    print(osrm_matrix.distances)
 
-    save_parquet(df_osrm_dur, OUTPUT_PATH / "df_osrm_dur")
-    save_parquet(df_osrm_dist, OUTPUT_PATH / "df_osrm_dist")
+    # format long : une ligne par paire (src_index, dst_index, duration, distance)
+    save_parquet(osrm_matrix.to_long(), OUTPUT_PATH / "osrm_matrix")
     save_parquet(df_clustered, OUTPUT_PATH / "df_clustered")
 
     """
@@ -145,10 +150,10 @@ def main():
     # ITINERARY OPTIMIZATION
     ################################
 
-    optimizer = ItineraryOptimizer.from_list_matrix(
+    optimizer = ItineraryOptimizer.from_osrm_matrix(
             df_pois=df_clustered,
-            matrix=df_osrm_dur.to_numpy(),          # ou dist_matrix
-            metric="duration",          # indicatif, tu peux en faire qqch plus tard
+            osrm_matrix=osrm_matrix,
+            metric="duration",          # ou "distance"
             )
 
     df_itinerary = optimizer.solve_all_days()
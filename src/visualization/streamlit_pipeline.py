@@ -25,6 +25,8 @@ st.set_page_config(
 
 from src.features.pipeline import ItineraryPipeline
 from src.features.osrm import OSRMClientAsync
+from src.features.osrm_cache import OSRMMatrixCache
+from src.features.osrm_matrix import OSRMMatrix
 from src.features.post_clustering import build_osrm_matrices_async
 from src.features.itinerary_optimizer import ItineraryOptimizer
 from src.features.spatial_clustering import SpatialClusterer
@@ -69,6 +71,9 @@ POIS_PATH = Path("data/processed/merged_20260108_174125.parquet")
 CACHE_DIR = Path("cache_osrm")
 CACHE_DIR.mkdir(exist_ok=True)
 
+# cache persistant des paires OSRM (partagé entre toutes les requêtes)
+osrm_client.cache = OSRMMatrixCache(CACHE_DIR / "osrm_pairs.sqlite")
+
 # -------------------------------------------------------------------
 # INITIALISATION SESSION STATE
 # -------------------------------------------------------------------
@@ -438,25 +443,26 @@ def get_osrm_matrices(force_recompute=False):
 
     # Tentative de chargement depuis disque
     df_clustered = disk_cache_load(f"{key}_clustered", ext="parquet")
-    df_osrm_dist = disk_cache_load(f"{key}_dist", ext="parquet")
-    df_osrm_dur = disk_cache_load(f"{key}_dur", ext="parquet")
+    df_osrm_long = disk_cache_load(f"{key}_matrix", ext="parquet")
 
-    if df_clustered is not None and df_osrm_dist is not None and df_osrm_dur is not None:
-        cache_set("osrm_matrices", (df_clustered, df_osrm_dist, df_osrm_dur))
-        return df_clustered, df_osrm_dist, df_osrm_dur
+    if df_clustered is not None and df_osrm_long is not None:
+        osrm_matrix = OSRMMatrix.from_long(df_osrm_long)
+        cache_set("osrm_matrices", (df_clustered, osrm_matrix))
+        return df_clustered, osrm_matrix
 
     # Sinon : calcul OSRM
-    df_clustered, df_osrm_dist, df_osrm_dur = asyncio.run(
-        build_osrm_matrices_async(df_osrm_ready, osrm_client)
-    )
+    async def _build_matrices():
+        async with osrm_client:
+            return await build_osrm_matrices_async(df_osrm_ready, osrm_client)
+
+    df_clustered, osrm_matrix = asyncio.run(_build_matrices())
 
-    # Sauvegarde disque
+    # Sauvegarde disque (matrice au format long)
     disk_cache_save(f"{key}_clustered", df_clustered, ext="parquet")
-    disk_cache_save(f"{key}_dist", df_osrm_dist, ext="parquet")
-    disk_cache_save(f"{key}_dur", df_osrm_dur, ext="parquet")
+    disk_cache_save(f"{key}_matrix", osrm_matrix.to_long(), ext="parquet")
 
-    cache_set("osrm_matrices", (df_clustered, df_osrm_dist, df_osrm_dur))
-    return df_clustered, df_osrm_dist, df_osrm_dur
+    cache_set("osrm_matrices", (df_clustered, osrm_matrix))
+    return df_clustered, osrm_matrix
 
 @profile_step("4_itinerary")
 def get_itinerary(force_recompute=False):
@@ -465,11 +471,11 @@ def get_itinerary(force_recompute=False):
         if cached is not None:
             return cached
 
-    df_clustered, df_osrm_dist, df_osrm_dur = get_osrm_matrices()
+    df_clustered, osrm_matrix = get_osrm_matrices()
 
-    optimizer = ItineraryOptimizer.from_list_matrix(
+    optimizer = ItineraryOptimizer.from_osrm_matrix(
         df_pois=df_clustered,
-        matrix=df_osrm_dur.to_numpy(),
+        osrm_matrix=osrm_matrix,
         metric="duration",
     )
 
@@ -497,9 +503,11 @@ def get_osrm_routes(force_recompute=False):
     osrm_client = OSRMClientAsync()
     osrm_client.debug = debug_osrm
 
-    routes_geojson = asyncio.run(
-        optimizer.build_geojson_all_days_async(df_itinerary, osrm_client)
-    )
+    async def _build_routes():
+        async with osrm_client:
+            return await optimizer.build_geojson_all_days_async(df_itinerary, osrm_client)
+
+    routes_geojson = asyncio.run(_build_routes())
 
     cache_set("osrm_routes", routes_geojson)
     return routes_geojson
@@ -682,13 +690,13 @@ elif step == 2:
 elif step == 3:
     st.header("4️⃣ Matrices OSRM (durations / distances)")
 
-    df_clustered, df_osrm_dist, df_osrm_dur = get_osrm_matrices()
+    df_clustered, osrm_matrix = get_osrm_matrices()
 
     st.subheader("Durations (en secondes)")
-    st.dataframe(df_osrm_dur)
+    st.dataframe(pl.DataFrame(osrm_matrix.durations))
 
     st.subheader("Distances (en mètres)")
-    st.dataframe(df_osrm_dist)
+    st.dataframe(pl.DataFrame(osrm_matrix.distances))
 
     st.caption("Matrices calculées via OSRM (async + chunking).")
 
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pl = pytest.importorskip("polars")
+
+# les modules ETL s'importent en "etl.*" (lancés depuis src/data)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "data"))
+
+from etl.scoring.cell_aggregates import CellAggregates  # noqa: E402
+from etl.scoring.density import add_density  # noqa: E402
+from etl.scoring.diversity import add_diversity  # noqa: E402
+
+CATEGORIES = ["Patrimoine & Monuments", "Nature & Paysages", "Culture & Musées", None]
+NORM_COLS = ["density_commune_norm", "diversity_commune_norm"]
+
+
+def _pois(n: int, seed: int, null_h3: int) -> pl.DataFrame:
+    """POIs synthétiques ; les null_h3 premiers n'ont pas d'hexagone (coordonnées nulles)."""
+    rng = np.random.default_rng(seed)
+    cells = rng.integers(0, 300, n).astype(np.uint64)
+    return pl.DataFrame({
+        "h3_r8": pl.Series(cells, dtype=pl.UInt64).scatter(list(range(null_h3)), None),
+        "main_category": rng.choice(np.array(CATEGORIES, dtype=object), n).tolist(),
+    })
+
+
+def _full_norms(pois: pl.DataFrame) -> pl.DataFrame:
+    return (
+        pois.lazy()
+        .pipe(add_density, level="commune")
+        .pipe(add_diversity, level="commune")
+        .select("h3_r8", *NORM_COLS)
+        .unique()
+        .sort("h3_r8")
+        .collect()
+    )
+
+
+def _incremental_norms(base: pl.DataFrame, added: pl.DataFrame, removed: pl.DataFrame) -> pl.DataFrame:
+    aggregates, _ = CellAggregates.from_frame(base.lazy()).apply_delta(added.lazy(), removed.lazy())
+    return (
+        CellAggregates.cell_values(aggregates.histogram)
+        .with_columns(aggregates.norm_exprs())
+        .select("h3_r8", *NORM_COLS)
+        .sort("h3_r8")
+        .collect()
+    )
+
+
+@pytest.mark.parametrize("null_h3", [0, 500])
+def test_incremental_norms_match_full_recompute(null_h3):
+    base = _pois(5_000, seed=0, null_h3=null_h3)
+    added = _pois(300, seed=1, null_h3=null_h3 // 10)
+    removed = base.slice(1_000, 200)
+    snapshot = pl.concat([base.slice(0, 1_000), base.slice(1_200), added])
+
+    full = _full_norms(snapshot)
+    incremental = _incremental_norms(base, added, removed)
+
+    assert full["h3_r8"].null_count() == 0
+    assert full["h3_r8"].to_list() == incremental["h3_r8"].to_list()
+    for col in NORM_COLS:
+        np.testing.assert_allclose(full[col].to_numpy(), incremental[col].to_numpy(), rtol=1e-9)